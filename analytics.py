@@ -0,0 +1,627 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+from rollup import average_delay, average_duration
+from stats import STATS_KEYS, sketch_quantiles
+from timeindex import TimeIndex
+
+# ===================== OVERLAPPING AUTOMATIONS =====================
+
+OVERLAP_CHUNK_SIZE = 50_000  # Number of instances swept per output chunk
+
+
+def iter_overlaps(df, chunk_size=OVERLAP_CHUNK_SIZE):
+    """Yield every pair of overlapping automation instances, chunk by chunk.
+
+    Instances are sorted by start time once. For an instance ``i`` in that order,
+    the instances that start while ``i`` is still running form a contiguous range
+    ``(i, searchsorted(start, end_i))``, so the active set never has to be rebuilt
+    and the sweep costs O(n log n + k) for k overlapping pairs. Instances with the
+    same start time are different runs and are paired like any other.
+    """
+    df = df.dropna(subset=["start_time", "end_time"])
+    df = df.sort_values(["start_time", "end_time"], kind="mergesort")
+
+    names = df["name"].to_numpy()
+    starts = df["start_time"].to_numpy()
+    ends = df["end_time"].to_numpy()
+
+    # Index of the first instance starting at or after each instance's end
+    range_end = np.searchsorted(starts, ends, side="left")
+
+    for chunk_start in range(0, len(df), chunk_size):
+        left = np.arange(chunk_start, min(chunk_start + chunk_size, len(df)))
+        counts = np.maximum(range_end[left] - left - 1, 0)
+        if not counts.sum():
+            continue
+
+        # Expand each instance into its (i, j) candidate pairs
+        i = np.repeat(left, counts)
+        offsets = np.arange(len(i)) - np.repeat(np.cumsum(counts) - counts, counts)
+        j = i + 1 + offsets
+
+        # A zero-length run starting exactly at start_i does not overlap it
+        keep = ends[j] > starts[i]
+        i, j = i[keep], j[keep]
+
+        overlap = np.minimum(ends[i], ends[j]) - starts[j]
+        yield pd.DataFrame({
+            "name_1": names[i],
+            "start_time_1": starts[i],
+            "end_time_1": ends[i],
+            "name_2": names[j],
+            "start_time_2": starts[j],
+            "end_time_2": ends[j],
+            "Overlap_Minutes": overlap / np.timedelta64(1, "m"),
+        })
+
+
+def find_overlaps(df, chunk_size=OVERLAP_CHUNK_SIZE):
+    """Return the longest overlap for every pair of automation names.
+
+    Pairs are reduced chunk by chunk as they stream out of ``iter_overlaps``, so
+    memory is bounded by the chunk size and the number of distinct pairs rather
+    than by the total number of overlapping instances.
+    """
+    columns = [
+        "Automation_1", "Automation 1 Start", "Automation 1 End",
+        "Automation_2", "Automation 2 Start", "Automation 2 End",
+        "Overlap_Minutes"
+    ]
+
+    best = None
+    for pairs in iter_overlaps(df, chunk_size):
+        # Order each pair by name so (A, B) and (B, A) collapse into one row
+        swap = pairs["name_1"].to_numpy() > pairs["name_2"].to_numpy()
+        if swap.any():
+            for col_1, col_2 in [("name_1", "name_2"), ("start_time_1", "start_time_2"), ("end_time_1", "end_time_2")]:
+                values_1, values_2 = pairs[col_1].to_numpy(), pairs[col_2].to_numpy()
+                pairs[col_1] = np.where(swap, values_2, values_1)
+                pairs[col_2] = np.where(swap, values_1, values_2)
+
+        if best is not None:
+            pairs = pd.concat([best, pairs], ignore_index=True)
+        best = (
+            pairs.sort_values("Overlap_Minutes", ascending=False, kind="mergesort")
+            .drop_duplicates(subset=["name_1", "name_2"])
+        )
+
+    if best is None:
+        return pd.DataFrame(columns=columns)
+
+    best = best.rename(columns={
+        "name_1": "Automation_1",
+        "start_time_1": "Automation 1 Start",
+        "end_time_1": "Automation 1 End",
+        "name_2": "Automation_2",
+        "start_time_2": "Automation 2 Start",
+        "end_time_2": "Automation 2 End"
+    })
+    return best[columns].reset_index(drop=True)
+
+
+# ===================== RISKY HOURLY AUTOMATIONS =====================
+
+HOURLY_RUNS = 48  # Runs over the two sampled days that mark an automation as hourly
+TOTAL_INSTANCES = 30  # Number of most recent runs checked per hourly automation
+REQUIRED_OCCURRENCES = 2  # Long runs among those that make an automation risky
+RISKY_DURATION_MINUTES = 51  # A run this long is close to colliding with the next hourly run
+
+
+def find_risky_hourly_automations(
+    df,
+    required_occurrences=REQUIRED_OCCURRENCES,
+    total_instances=TOTAL_INSTANCES,
+    duration_threshold=RISKY_DURATION_MINUTES,
+    hourly_runs=HOURLY_RUNS,
+):
+    """Return hourly automations whose recent runs come close to an hour.
+
+    An automation is hourly when it ran at least ``hourly_runs`` times over the
+    last two days seen in the final week of data. It is risky when the mean of its
+    last ``total_instances`` durations exceeds ``duration_threshold``, or when at
+    least ``required_occurrences`` of them reach it. All automations are checked in
+    one sort and one grouped pass.
+    """
+    # Step 1: Identify two distinct one-day timeframes from last week's data
+    last_week_start = df["start_time"].max() - pd.Timedelta(days=7)
+    df_last_week = TimeIndex(df, "start_time").between(last_week_start)
+
+    run_days = df_last_week["start_time"].dt.normalize()
+    unique_days = run_days.unique()
+    selected_days = unique_days[-2:]
+
+    # Step 2: Find hourly automations
+    run_counts = df_last_week[run_days.isin(selected_days)].groupby("name", observed=True)["start_time"].count()
+    hourly_automations = run_counts.index[run_counts >= hourly_runs]
+
+    # Step 3: Take the last runs of every hourly automation at once
+    recent = (
+        df[df["name"].isin(hourly_automations)]
+        .sort_values("start_time", ascending=False, na_position="last", kind="mergesort")
+        .groupby("name", observed=True)
+        .head(total_instances)
+    )
+    summary = (
+        recent.assign(long_run=recent["duration"] >= duration_threshold)
+        .groupby("name", observed=True)
+        .agg(avg_duration=("duration", "mean"), long_runs=("long_run", "sum"))
+    )
+
+    above_average = summary["avg_duration"] > duration_threshold
+    summary = summary[above_average | (summary["long_runs"] >= required_occurrences)]
+    reasons = np.where(
+        above_average[summary.index],
+        f"Avg duration is above {duration_threshold} min",
+        "There have been " + summary["long_runs"].astype(str) + f" occurrences over {duration_threshold} min",
+    )
+    return pd.DataFrame({"Automation Name": summary.index.astype(str), "Reason": reasons})
+
+
+# ===================== PERFORMANCE COMPARISON =====================
+
+
+def compare_timeframes(df_first, df_second, by):
+    """Compare mean durations per ``by`` group between two slices of the daily rollup.
+
+    Groups that only ran in one timeframe get 0 for the other; groups without any
+    measured duration in either are dropped.
+    """
+    first = average_duration(df_first, by).rename(columns={"duration": "Avg Duration (First)"})
+    second = average_duration(df_second, by).rename(columns={"duration": "Avg Duration (Second)"})
+
+    comparison_df = pd.merge(first, second, on=by, how="outer").fillna(0)
+    return comparison_df[(comparison_df["Avg Duration (First)"] > 0) | (comparison_df["Avg Duration (Second)"] > 0)]
+
+
+# ===================== DELAYS AND RUSH HOURS =====================
+
+RUSH_HOUR_MIN_RUNS = 3  # Scheduled runs in one hour that make it a rush hour
+
+
+def find_delayed_automations(df_rollup):
+    """Return the mean start delay of every automation in the rollup."""
+    return average_delay(df_rollup).rename(columns={"name": "Automation Name", "delay_minutes": "Avg Delay (minutes)"})
+
+
+def previous_month(latest):
+    """Return midnight of the first and last day of the calendar month before ``latest``.
+
+    Select the month's rows with the half-open range ``[first day, first day + 1 month)``.
+    """
+    month_start = (latest - pd.DateOffset(months=1)).normalize().replace(day=1)
+    return month_start, month_start + pd.DateOffset(months=1) - pd.Timedelta(days=1)
+
+
+def find_rush_hours(df_rollup, min_runs=RUSH_HOUR_MIN_RUNS):
+    """Return the scheduled hour slots of the hourly rollup with at least ``min_runs`` runs.
+
+    Slots are counted from the summed ``runs``, and only the slots that qualify
+    list their automations, each once per run as in the raw data.
+    """
+    hour_slots = df_rollup.groupby(["scheduled_hour", "name"], observed=True)["runs"].sum().reset_index()
+    hour_slots = hour_slots[hour_slots.groupby("scheduled_hour")["runs"].transform("sum") >= min_runs]
+    counts = hour_slots.groupby("scheduled_hour")["runs"].sum()
+    runs = hour_slots["runs"].to_numpy()
+    names = pd.Series(np.repeat(hour_slots["name"].astype(str).to_numpy(), runs)).groupby(
+        np.repeat(hour_slots["scheduled_hour"].to_numpy(), runs)
+    ).agg(list)
+    return pd.DataFrame({
+        "Hour Slot": counts.index.strftime("%Y-%m-%d %H:00"),
+        "Automation_Count": counts.to_numpy(),
+        "Automation_Names": names.reindex(counts.index).to_numpy(),
+    })
+
+
+# ===================== REGRESSIONS =====================
+
+REGRESSION_MIN_RUNS = 10  # Runs an automation needs before it is ranked
+REGRESSION_TOP = 20  # Automations listed by find_regressed_automations
+
+
+def find_regressed_automations(stats, sketch, limit=REGRESSION_TOP, min_runs=REGRESSION_MIN_RUNS):
+    """Return the automations whose recent runs are slowest against their own history, worst first.
+
+    ``stats`` and ``sketch`` come from ``stats.load_automation_stats``, so ranking
+    every automation is a lookup over one row each. The score is how many
+    standard deviations the EWMA of the duration lies above its long-run mean;
+    only automations with ``min_runs`` timed runs and a positive score are listed.
+    """
+    df = stats[stats["duration_count"] >= min_runs]
+    std = np.sqrt(df["duration_m2"] / df["duration_count"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = (df["duration_ewma"] - df["duration_mean"]) / std.where(std > 0)
+
+    regressed = df.assign(score=score)
+    regressed = regressed[regressed["score"] > 0]
+    regressed = regressed.merge(sketch_quantiles(sketch, "duration"), on=STATS_KEYS, how="left")
+    regressed = regressed.sort_values(["score", "name"], ascending=[False, True], kind="mergesort").head(limit)
+    return pd.DataFrame({
+        "Automation Name": regressed["name"],
+        "MemberID": regressed["MemberID"],
+        "Runs": regressed["duration_count"],
+        "Avg Duration (minutes)": regressed["duration_mean"],
+        "Recent Duration (minutes)": regressed["duration_ewma"],
+        "p50 Duration (minutes)": regressed["p50"],
+        "p95 Duration (minutes)": regressed["p95"],
+        "Recent Delay (minutes)": regressed["delay_ewma"],
+        "Regression (σ)": regressed["score"],
+    }).reset_index(drop=True)
+
+
+# ===================== CONCURRENCY =====================
+
+CONCURRENCY_FREQS = {"Minute": "min", "15 minutes": "15min", "Hour": "h"}  # Slot widths offered by the dashboard
+CONCURRENCY_TOP_SLOTS = 50  # Busiest slots listed by find_peak_concurrency
+CONCURRENCY_TOP_CONTRIBUTORS = 3  # Automations named per listed slot
+
+
+def _run_bounds(df_automation):
+    # Runs with both timestamps, ordered by start, and their bounds as int64 nanoseconds
+    df = df_automation.dropna(subset=["start_time", "end_time"])
+    df = df[df["end_time"] >= df["start_time"]].sort_values("start_time", kind="mergesort")
+    starts = df["start_time"].to_numpy().astype("datetime64[ns]").view(np.int64)
+    ends = df["end_time"].to_numpy().astype("datetime64[ns]").view(np.int64)
+    return df, starts, ends
+
+
+def concurrency_profile(df_automation, freq="15min"):
+    """Return the peak number of automations running at once in every ``freq`` slot.
+
+    Starts (+1) and ends (-1) are swept in time order, ends first on ties so a run
+    starting as another one ends does not overlap it (as in ``iter_overlaps``),
+    and their cumulative sum after the last event at each time is the number of
+    runs in progress from then on.
+    A slot's peak is the highest count reached inside it, or carried into it when
+    something is still running at its start (no event falls on the slot start).
+    Slots are integer bucket numbers of the event times, so no timestamp is
+    formatted or grouped as text. Returns ``slot``, ``peak`` and ``started`` (runs
+    starting in the slot) for every slot in which something runs.
+    """
+    _, starts, ends = _run_bounds(df_automation)
+    if not len(starts):
+        return pd.DataFrame({"slot": pd.Series(dtype="datetime64[ns]"), "peak": pd.Series(dtype=np.int64), "started": pd.Series(dtype=np.int64)})
+
+    step = to_offset(freq).nanos
+    times = np.concatenate([starts, ends])
+    deltas = np.concatenate([np.ones(len(starts), dtype=np.int64), np.full(len(ends), -1, dtype=np.int64)])
+    order = np.lexsort((deltas, times))
+    times, running = times[order], np.cumsum(deltas[order])
+    # Only the count after the last event at a time is a real state; between tied events it is not
+    settled = np.append(times[1:] != times[:-1], True)
+    times, running = times[settled], running[settled]
+
+    # Slots are numbered from the first start; events are in slot order after the sort
+    first_slot = starts[0] // step
+    event_slots = times // step - first_slot
+    n_slots = int(event_slots[-1]) + 1
+    slots_with_events, first_event = np.unique(event_slots, return_index=True)
+    last_event = np.append(first_event[1:], len(running)) - 1
+
+    peak = np.zeros(n_slots, dtype=np.int64)
+    peak[slots_with_events] = np.maximum.reduceat(running, first_event)
+
+    # A slot without events keeps the count the last slot with events ended on
+    level = np.zeros(n_slots, dtype=np.int64)
+    level[slots_with_events] = running[last_event]
+    has_events = np.zeros(n_slots, dtype=bool)
+    has_events[slots_with_events] = True
+    level = level[np.maximum.accumulate(np.where(has_events, np.arange(n_slots), 0))]
+    # The carried count only holds in a slot until its first event; a run ending on the slot start is over
+    first_time = np.full(n_slots, np.iinfo(np.int64).max)
+    first_time[slots_with_events] = times[first_event]
+    carried = np.where(first_time > (np.arange(n_slots) + first_slot) * step, np.append(0, level[:-1]), 0)
+    peak = np.maximum(peak, carried)
+
+    started = np.bincount(starts // step - first_slot, minlength=n_slots)
+    busy = np.flatnonzero(peak > 0)
+    return pd.DataFrame({
+        "slot": pd.to_datetime((busy + first_slot) * step),
+        "peak": peak[busy],
+        "started": started[busy],
+    })
+
+
+def slot_contributors(df_automation, slots, freq="15min", top=CONCURRENCY_TOP_CONTRIBUTORS):
+    """Return, for each slot start in ``slots``, the ``top`` automation names by running time in the slot.
+
+    The runs that can reach into a slot start at most one longest run before it
+    and before its end, a contiguous range of the start-ordered runs found with
+    two binary searches, so only those candidates are measured.
+    """
+    df, starts, ends = _run_bounds(df_automation)
+    if not len(starts):
+        return [[] for _ in slots]
+
+    step = to_offset(freq).nanos
+    slot_starts = pd.to_datetime(pd.Series(slots)).to_numpy().astype("datetime64[ns]").view(np.int64)
+    slot_ends = slot_starts + step
+    lo = np.searchsorted(starts, slot_starts - (ends - starts).max(), side="left")
+    hi = np.searchsorted(starts, slot_ends, side="left")
+
+    # Expand each slot into its candidate runs and keep the time each one spends in it
+    counts = hi - lo
+    slot_idx = np.repeat(np.arange(len(slot_starts)), counts)
+    run_idx = np.repeat(lo, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    overlap = np.minimum(ends[run_idx], slot_ends[slot_idx]) - np.maximum(starts[run_idx], slot_starts[slot_idx])
+    inside = overlap > 0
+
+    busy = pd.DataFrame({
+        "slot": slot_idx[inside],
+        "name": df["name"].astype(str).to_numpy()[run_idx[inside]],
+        "busy": overlap[inside],
+    })
+    busy = busy.groupby(["slot", "name"], sort=False)["busy"].sum().reset_index()
+    busy = busy.sort_values(["slot", "busy", "name"], ascending=[True, False, True], kind="mergesort")
+    names = busy.groupby("slot").head(top).groupby("slot")["name"].agg(list)
+    return [names.get(i, []) for i in range(len(slot_starts))]
+
+
+def find_peak_concurrency(df_automation, freq="15min", limit=CONCURRENCY_TOP_SLOTS, top=CONCURRENCY_TOP_CONTRIBUTORS):
+    """Return the ``limit`` slots with the most automations running at once, busiest first.
+
+    Each slot lists its peak concurrency (see ``concurrency_profile``), the runs
+    started in it and its ``top`` contributors (see ``slot_contributors``).
+    """
+    profile = concurrency_profile(df_automation, freq)
+    peaks = profile.sort_values(["peak", "slot"], ascending=[False, True], kind="mergesort").head(limit).reset_index(drop=True)
+    peaks["contributors"] = slot_contributors(df_automation, peaks["slot"], freq, top)
+    peaks.columns = ["Slot", "Peak Concurrency", "Runs Started", "Top Contributors"]
+    return peaks
+
+
+# ===================== TIMELINE =====================
+
+
+def timeline_frame(df_automation):
+    """Prepare automation runs for the Gantt chart.
+
+    Runs are labelled ``"<MemberID> | <name>"`` when more than one Business Unit is
+    present, so automations with the same name in different BUs get separate rows.
+    """
+    df_timeline = df_automation[["name", "start_time", "end_time"]].copy()
+    # An export without a MemberID column is shown as a single, unnamed Business Unit
+    df_timeline["MemberID"] = df_automation["MemberID"] if "MemberID" in df_automation.columns else ""
+    df_timeline["duration_minutes"] = (df_timeline["end_time"] - df_timeline["start_time"]).dt.total_seconds() / 60
+
+    if df_timeline["MemberID"].nunique() > 1:
+        df_timeline["display_name"] = df_timeline["MemberID"].astype(str) + " | " + df_timeline["name"].astype(str)
+    else:
+        df_timeline["display_name"] = df_timeline["name"]
+    return df_timeline
+
+
+# ===================== TIMELINE LEVEL OF DETAIL =====================
+
+TIMELINE_MAX_BARS = 2_000  # Bars the Gantt chart may draw before runs are merged into bands
+TIMELINE_WINDOW_DAYS = 7  # Default span of the timeline, ending on the day of the last run
+TIMELINE_BAND_FREQS = ["15min", "h", "6h", "D", "7D", "30D"]  # Band widths to try, finest first
+
+
+def timeline_window(df_automation, start=None, end=None):
+    """Return the runs that are running at some point in ``[start, end)``.
+
+    A run still going at ``start`` began at most the longest run time before it,
+    so only the runs starting between then and ``end`` are found, with two binary
+    searches over the start times, and of those the ones still running at
+    ``start`` are kept.
+    """
+    index = TimeIndex(df_automation, "start_time")
+    if start is None:
+        return index.between(None, end)
+    start = pd.Timestamp(start)
+    longest = (df_automation["end_time"] - df_automation["start_time"]).max()
+    df = index.between(start - longest if pd.notna(longest) else None, end)
+    return df[df["end_time"] > start]
+
+
+def timeline_bands(df_timeline, freq):
+    """Merge the runs of each timeline row into one occupancy band per ``freq`` bucket.
+
+    A band spans from the first start to the last end of the runs that start in
+    its bucket. ``runs`` and ``busy_minutes`` say what it stands for, and
+    ``occupancy_percent`` is the busy time over the bucket length (above 100 when
+    runs overlap).
+    """
+    bucket = df_timeline["start_time"].dt.floor(freq).rename("bucket")
+    bands = df_timeline.groupby(["display_name", "name", "MemberID", bucket], observed=True, sort=False).agg(
+        start_time=("start_time", "min"),
+        end_time=("end_time", "max"),
+        runs=("start_time", "size"),
+        busy_minutes=("duration_minutes", "sum"),
+    )
+    bands = bands.reset_index().drop(columns="bucket")
+    bands["occupancy_percent"] = bands["busy_minutes"] / (to_offset(freq).nanos / 60e9) * 100
+    return bands
+
+
+def timeline_level_of_detail(df_timeline, max_bars=TIMELINE_MAX_BARS, freqs=TIMELINE_BAND_FREQS):
+    """Return ``(frame, freq)`` for a Gantt chart of at most ``max_bars`` bars.
+
+    Runs get a bar each (``freq`` is None) when they fit the budget. Otherwise
+    they are merged by ``timeline_bands`` at the finest width in ``freqs`` that
+    fits, or the coarsest one if none does. Band counts are taken from integer
+    bucket numbers, so only the chosen width is aggregated.
+    """
+    df_timeline = df_timeline.dropna(subset=["start_time", "end_time"])
+    if len(df_timeline) <= max_bars:
+        return df_timeline, None
+
+    labels = pd.factorize(df_timeline["display_name"])[0].astype(np.int64)
+    starts = df_timeline["start_time"].to_numpy().astype("datetime64[ns]").view(np.int64)
+    for freq in freqs:
+        buckets = starts // to_offset(freq).nanos
+        if len(pd.unique(buckets * (labels.max() + 1) + labels)) <= max_bars:
+            break
+    return timeline_bands(df_timeline, freq), freq
+
+
+# ===================== ACTIVITY TIME-OUT RISK =====================
+
+QUERY_ACTIVITY_TYPE = 300
+SCRIPT_ACTIVITY_TYPE = 423
+TIMEOUT_RISK_MINUTES = 20  # Average duration that puts an activity at risk of timing out
+
+# Risk threshold in minutes per activity type; only these types are checked
+TIMEOUT_RISK_THRESHOLDS = {
+    QUERY_ACTIVITY_TYPE: TIMEOUT_RISK_MINUTES,
+    SCRIPT_ACTIVITY_TYPE: TIMEOUT_RISK_MINUTES,
+}
+
+
+def find_timeout_risks(df_activity_rollup, df_dimension, thresholds=TIMEOUT_RISK_THRESHOLDS):
+    """Return ``{activity type: DataFrame}`` of activities whose average duration exceeds the type's threshold.
+
+    All activity types are averaged in one grouped pass over the activity rollup
+    (see ``rollup.build_activity_rollup``) and joined once against the automation
+    dimension (see ``rollup.build_automation_dimension``). Each activity is
+    reported once per automation and Business Unit it belongs to.
+    """
+    df = df_activity_rollup[df_activity_rollup["activity_type"].isin(list(thresholds))]
+    sums = df.groupby(["activity_type", "activity_name", "AutomationCustomerKey"], observed=True)[["duration_sum", "duration_count"]].sum()
+    sums = sums[sums["duration_count"] > 0]
+    risk = (sums["duration_sum"] / sums["duration_count"]).reset_index(name="duration")
+    risk = risk[risk["duration"] > risk["activity_type"].map(thresholds).astype(float)]
+
+    # Look up MemberID & Automation Name of each AutomationCustomerKey
+    risk = risk.merge(df_dimension, on="AutomationCustomerKey", how="left")
+
+    risk = risk.rename(columns={
+        "activity_name": "Activity Name",
+        "name": "Automation Name",
+        "duration": "Avg Duration (minutes)"
+    })
+
+    # Each Activity Name should appear only once per Automation & MemberID (when the export has one)
+    keys = [col for col in ["Activity Name", "Automation Name", "MemberID"] if col in risk.columns]
+    risk = risk.drop_duplicates(subset=["activity_type"] + keys)
+    columns = keys + ["Avg Duration (minutes)"]
+    return {
+        activity_type: risk.loc[risk["activity_type"] == activity_type, columns].reset_index(drop=True)
+        for activity_type in thresholds
+    }
+
+
+# ===================== ACTIVITY CRITICAL PATH =====================
+
+CRITICAL_PATH_TOP_RUNS = 50  # Slowest runs listed with their slowest step
+RUN_LOOKBACK = 3  # Earlier runs of an automation tried when the latest one ended before the activity
+
+# Activity columns the interval join and the breakdown read
+ACTIVITY_RUN_COLUMNS = ["AutomationCustomerKey", "activity_name", "activity_start_time", "activity_end_time", "duration"]
+
+
+def _shared_codes(left, right):
+    # Integer codes of two key columns over one set of categories, so they can be joined as numbers
+    categories = pd.Index(pd.unique(left.dropna())).union(pd.Index(pd.unique(right.dropna())))
+    return (
+        pd.Categorical(left, categories=categories).codes,
+        pd.Categorical(right, categories=categories).codes,
+    )
+
+
+def assign_activity_runs(df_activity, df_automation, lookback=RUN_LOOKBACK):
+    """Return ``df_activity`` with the automation run each activity instance ran in.
+
+    The parent of an activity is a run of the same ``AutomationCustomerKey``
+    whose ``[start_time, end_time]`` contains the activity's start and end. Both
+    sides are sorted by start time once and matched with an as-of join: per key,
+    the latest run started at or before the activity is the first candidate.
+    When it ended too early (runs of one automation can overlap), up to
+    ``lookback`` earlier runs of the key are tried. Adds ``run`` (the run's index
+    label in ``df_automation``, missing when no run contains the activity),
+    ``run_start`` and ``run_end``.
+    """
+    activities = df_activity.dropna(subset=["activity_start_time", "activity_end_time"])
+    runs = df_automation.dropna(subset=["start_time", "end_time"])
+    activity_keys, run_keys = _shared_codes(activities["AutomationCustomerKey"], runs["AutomationCustomerKey"])
+
+    # Runs ordered by key, then start: the previous candidate of a run is the row before it
+    order = np.lexsort((runs["start_time"].to_numpy(), run_keys))
+    keys = run_keys[order]
+    starts = runs["start_time"].to_numpy()[order]
+    ends = runs["end_time"].to_numpy()[order]
+
+    left = pd.DataFrame({
+        "key": activity_keys,
+        "activity_start_time": activities["activity_start_time"].to_numpy(),
+        "position": np.arange(len(activities)),
+    }).sort_values("activity_start_time", kind="mergesort")
+    right = pd.DataFrame({"key": keys, "run_start": starts, "candidate": np.arange(len(keys))}).sort_values("run_start", kind="mergesort")
+    matched = pd.merge_asof(
+        left[left["key"] >= 0], right[right["key"] >= 0],
+        left_on="activity_start_time", right_on="run_start", by="key", direction="backward",
+    ).dropna(subset=["candidate"])
+
+    position = matched["position"].to_numpy()
+    key = matched["key"].to_numpy()
+    candidate = matched["candidate"].to_numpy().astype(np.int64)
+    activity_ends = activities["activity_end_time"].to_numpy()[position]
+
+    run_of = np.full(len(activities), -1, dtype=np.int64)
+    for _ in range(lookback + 1):
+        contains = ends[candidate] >= activity_ends
+        run_of[position[contains]] = candidate[contains]
+        # Step back to the key's previous run for the activities still without a parent
+        position, key, candidate, activity_ends = (
+            values[~contains] for values in (position, key, candidate - 1, activity_ends)
+        )
+        valid = candidate >= 0
+        valid[valid] = keys[candidate[valid]] == key[valid]
+        position, key, candidate, activity_ends = (values[valid] for values in (position, key, candidate, activity_ends))
+        if not len(position):
+            break
+
+    found = run_of >= 0
+    labels = activities.index[found]
+    df = df_activity.copy()
+    df["run"] = pd.Series(runs.index.to_numpy()[order][run_of[found]], index=labels).reindex(df.index).astype("Int64")
+    df["run_start"] = pd.Series(starts[run_of[found]], index=labels).reindex(df.index)
+    df["run_end"] = pd.Series(ends[run_of[found]], index=labels).reindex(df.index)
+    return df
+
+
+def run_breakdown(df_activity_runs, df_automation):
+    """Return the time each activity took in each run and its share of the run.
+
+    ``df_activity_runs`` comes from ``assign_activity_runs``; activities that
+    appear several times in a run are summed. ``Share of Run (%)`` is the
+    activity's duration over the run's duration, so the shares of a run add up
+    to less than 100 where the run waited between activities.
+    """
+    df = df_activity_runs[df_activity_runs["run"].notna()]
+    steps = df.groupby(["run", "activity_name"], observed=True, sort=False)["duration"].sum().astype("float64").reset_index()
+
+    runs = df_automation.loc[steps["run"].to_numpy()]
+    run_minutes = ((runs["end_time"] - runs["start_time"]).dt.total_seconds() / 60).to_numpy()
+    breakdown = pd.DataFrame({
+        "run": steps["run"].to_numpy(),
+        "Automation Name": runs["name"].to_numpy(),
+        "Run Start": runs["start_time"].to_numpy(),
+        "Run Duration (minutes)": run_minutes,
+        "Activity Name": steps["activity_name"].to_numpy(),
+        "Duration (minutes)": steps["duration"].to_numpy(),
+    })
+    if "MemberID" in runs.columns:
+        breakdown.insert(2, "MemberID", runs["MemberID"].to_numpy())
+    with np.errstate(divide="ignore", invalid="ignore"):
+        breakdown["Share of Run (%)"] = np.where(run_minutes > 0, breakdown["Duration (minutes)"] / run_minutes * 100, np.nan)
+    return breakdown
+
+
+def find_slowest_steps(breakdown, limit=CRITICAL_PATH_TOP_RUNS):
+    """Return the ``limit`` longest runs with the activity that took the most time in each.
+
+    ``breakdown`` comes from ``run_breakdown``; ``Activities`` counts the distinct
+    activities of the run.
+    """
+    ordered = breakdown.sort_values(["run", "Duration (minutes)"], kind="mergesort")
+    slowest = ordered.drop_duplicates("run", keep="last").set_index("run")
+    slowest["Activities"] = breakdown.groupby("run").size()
+    slowest = slowest.rename(columns={
+        "Activity Name": "Slowest Activity",
+        "Duration (minutes)": "Slowest Activity (minutes)",
+    })
+    slowest = slowest.sort_values(["Run Duration (minutes)", "Run Start"], ascending=[False, True], kind="mergesort").head(limit)
+    return slowest.reset_index()
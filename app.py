@@ -1,3 +1,5 @@
+import multiprocessing
+import os
 import streamlit as st
 import pandas as pd
 import plotly.express as px
@@ -5,68 +7,223 @@ import numpy as np
 from datetime import datetime, timedelta
 from itertools import combinations
 
+from analytics import (
+    ACTIVITY_RUN_COLUMNS,
+    QUERY_ACTIVITY_TYPE,
+    CONCURRENCY_FREQS,
+    SCRIPT_ACTIVITY_TYPE,
+    TIMELINE_MAX_BARS,
+    TIMELINE_WINDOW_DAYS,
+    assign_activity_runs,
+    compare_timeframes,
+    concurrency_profile,
+    find_delayed_automations,
+    find_slowest_steps,
+    find_overlaps,
+    find_peak_concurrency,
+    find_regressed_automations,
+    find_risky_hourly_automations,
+    find_rush_hours,
+    find_timeout_risks,
+    previous_month,
+    run_breakdown,
+    timeline_frame,
+    timeline_level_of_detail,
+    timeline_window,
+)
+from loader import (
+    activity_file_path,
+    automation_file_path,
+    file_signature,
+    load_activity_data,
+    load_activity_rollup,
+    load_automation_data,
+    load_automation_rollup,
+)
+from parallel import analyze_by_member
+from rollup import build_automation_dimension, coarsen_rollup, status_counts, weekly_average_duration
+from profiling import Profiler, activate
+from stats import load_automation_stats
+from store import HistoryStore, database_file_path
+from tables import paged_table
+from timeindex import TimeIndex
+
+# ===================== PROFILING =====================
+
+# Stage timings for the sidebar Performance panel; a disabled profiler records nothing
+profiler = Profiler(enabled=st.session_state.get("show_performance", False))
+activate(profiler)
+
 # ===================== DATA SETUP =====================
 
-# Define file paths
-automation_file_path = "automation_data.csv"  # Ensure this file exists in the working directory
-activity_file_path = "automation_activity_data.csv"  # Ensure this file exists in the working directory
+# Keep parsed frames for a handful of export versions; older ones are evicted first
+MAX_CACHED_EXPORTS = 4
 
-# Define date columns for parsing
-automation_date_columns = [
-    "AutomationInstanceStartTime_UTC", 
-    "AutomationInstanceEndTime_UTC", 
-    "AutomationInstanceScheduledTime_UTC"
-]
 
-activity_date_columns = [
-    "ActivityInstanceStartTime_UTC", 
-    "ActivityInstanceEndTime_UTC"
+# Columns the pages work with; the long error text is only read when it is displayed
+automation_columns = [
+    "name", "AutomationCustomerKey", "scheduled_time", "start_time", "end_time",
+    "status", "MemberID", "duration", "delay_minutes"
 ]
 
-# Load Automation Data
-df_automation = pd.read_csv(automation_file_path)
 
-for col in automation_date_columns:
-    df_automation[col] = pd.to_datetime(df_automation[col], format="%m/%d/%Y %I:%M:%S %p", errors="coerce")  # Correct format
+# The size and mtime arguments are only part of the cache key: a new export gets a new entry
+@st.cache_data(max_entries=MAX_CACHED_EXPORTS, show_spinner=False)
+def cached_automation_data(path, size, mtime, columns=None):
+    return load_automation_data(path, columns)
+
+
+@st.cache_data(max_entries=MAX_CACHED_EXPORTS, show_spinner=False)
+def cached_automation_rollup(path, size, mtime, freq="h"):
+    # The hourly cube serves schedule views, coarser cubes serve start-time views
+    df_rollup = load_automation_rollup(path)
+    if freq == "h":
+        return df_rollup.sort_values("scheduled_hour", kind="mergesort", na_position="last")
+    return coarsen_rollup(df_rollup, freq).sort_values("start_period", kind="mergesort", na_position="last")
+
+
+@st.cache_data(max_entries=MAX_CACHED_EXPORTS, show_spinner=False)
+def cached_activity_rollup(path, size, mtime):
+    # Per-activity duration sums; the activity rows are streamed into them, never held in memory
+    return load_activity_rollup(path)
+
+
+def select_members(df, member_ids):
+    return df if member_ids is None else df[df["MemberID"].isin(member_ids)]
+
+
+# Whole-history analyses are keyed on the export and the Business Unit selection, so
+# they only run again when one of those changes, not on every widget interaction
+@st.cache_data(max_entries=MAX_CACHED_EXPORTS, show_spinner=False)
+def cached_risky_hourly_automations(path, size, mtime, member_ids, **thresholds):
+    df = select_members(cached_automation_data(path, size, mtime, columns=automation_columns), member_ids)
+    return find_risky_hourly_automations(df, **thresholds)
+
+
+@st.cache_data(max_entries=MAX_CACHED_EXPORTS, show_spinner=False)
+def cached_automation_dimension(path, size, mtime, member_ids):
+    # One row per automation (key, mID, name) for joining activities
+    df = select_members(cached_automation_data(path, size, mtime, columns=automation_columns), member_ids)
+    return build_automation_dimension(df)
+
+
+@st.cache_data(max_entries=MAX_CACHED_EXPORTS, show_spinner=False)
+def cached_concurrency(path, size, mtime, member_ids, freq):
+    # Daily peaks for the chart and the busiest slots with their contributors
+    df = select_members(cached_automation_data(path, size, mtime, columns=automation_columns), member_ids)
+    daily_peaks = concurrency_profile(df, freq).set_index("slot")["peak"].resample("D").max().fillna(0).reset_index()
+    return daily_peaks, find_peak_concurrency(df, freq)
+
+
+@st.cache_data(max_entries=MAX_CACHED_EXPORTS, show_spinner=False)
+def cached_automation_stats(path, size, mtime):
+    # Per-automation running statistics, kept next to the export and updated with appended runs only
+    return load_automation_stats(path)
+
+
+# Built once per export and Business Unit selection, and shared by every session rather
+# than copied: queries only slice the frames, and the lazily built per-name positions are
+# the same whichever session builds them
+@st.cache_resource(max_entries=MAX_CACHED_EXPORTS, show_spinner=False)
+def cached_time_indexes(path, size, mtime, member_ids):
+    df = select_members(cached_automation_data(path, size, mtime, columns=automation_columns), member_ids)
+    df_daily_rollup = select_members(cached_automation_rollup(path, size, mtime, freq="D"), member_ids)
+    df_rollup = select_members(cached_automation_rollup(path, size, mtime), member_ids)
+    return TimeIndex(df, "start_time"), TimeIndex(df_daily_rollup, "start_period", by="name"), TimeIndex(df_rollup, "scheduled_hour")
+
+
+@st.cache_data(max_entries=MAX_CACHED_EXPORTS, show_spinner=False)
+def cached_overlaps(path, size, mtime, member_ids):
+    df = select_members(cached_automation_data(path, size, mtime, columns=automation_columns), member_ids)
+    return find_overlaps(df)
+
+
+@st.cache_data(max_entries=MAX_CACHED_EXPORTS, show_spinner=False)
+def cached_run_breakdown(activity_signature, automation_signature, member_ids):
+    # Activity rows are only read here, for the columns the interval join needs
+    df_runs = select_members(cached_automation_data(*automation_signature, columns=automation_columns), member_ids)
+    df_activity = load_activity_data(activity_signature[0], columns=ACTIVITY_RUN_COLUMNS)
+    return run_breakdown(assign_activity_runs(df_activity, df_runs), df_runs)
+
+
+@st.cache_data(max_entries=MAX_CACHED_EXPORTS, show_spinner=False)
+def cached_member_analytics(automation_signature, activity_signature, member_ids, workers):
+    # Risky hourly, delay, rush hour and time-out risk tables per Business Unit, computed in a process pool.
+    # The server is multi-threaded, so workers are spawned rather than forked from it
+    df = select_members(cached_automation_data(*automation_signature, columns=automation_columns), member_ids)
+    df_rollup = select_members(cached_automation_rollup(*automation_signature), member_ids)
+    df_activity_rollup = cached_activity_rollup(*activity_signature) if activity_signature is not None else None
+    return analyze_by_member(df, df_rollup, df_activity_rollup, workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+# Optional SQL store (see store.py): when the database file exists, the sidebar, status,
+# trend, comparison, delay, schedule and activity views query it with their filters
+# pushed down, and the export snapshot is only read by the whole-history views
+use_database = os.path.exists(database_file_path)
+
 
-# Rename columns for consistency
-rename_map_automation = {
-    "AutomationName": "name",
-    "AutomationInstanceStartTime_UTC": "start_time",
-    "AutomationInstanceScheduledTime_UTC": "scheduled_time",
-    "AutomationInstanceEndTime_UTC": "end_time",
-    "AutomationInstanceStatus": "status",
-    "AutomationInstanceActivityErrorDetails": "error"
-}
-df_automation.rename(columns=rename_map_automation, inplace=True)
+@st.cache_data(max_entries=MAX_CACHED_EXPORTS, show_spinner=False)
+def cached_store_sync(path, automation_signature, activity_signature):
+    # Runs once per export version: rows appended to the exports are imported before any query
+    with HistoryStore(path) as store:
+        imported = store.sync(automation_signature[0], "automations")
+        if activity_signature is not None:
+            imported += store.sync(activity_signature[0], "activities")
+    return imported
 
-# Ensure MemberID is treated as a string if the column exists
-if "MemberID" in df_automation.columns:
-    df_automation["MemberID"] = df_automation["MemberID"].astype(str)
 
-# Calculate duration in minutes
-df_automation["duration"] = (df_automation["end_time"] - df_automation["start_time"]).dt.total_seconds() / 60
+@st.cache_data(max_entries=MAX_CACHED_EXPORTS, show_spinner=False)
+def cached_store_member_ids(path, size, mtime):
+    with HistoryStore(path, read_only=True) as store:
+        return store.member_ids()
 
-# Load Automation Activity Data
-df_activity = pd.read_csv(activity_file_path)
 
-for col in activity_date_columns:
-    df_activity[col] = pd.to_datetime(df_activity[col], format="%m/%d/%Y %I:%M:%S %p", errors="coerce")  # Correct format
+@st.cache_data(max_entries=MAX_CACHED_EXPORTS, show_spinner=False)
+def cached_store_summary(path, size, mtime, member_ids):
+    with HistoryStore(path, read_only=True) as store:
+        return store.summary(member_ids)
 
-rename_map_activity = {
-    "AutomationName": "automation_name",
-    "ActivityType": "activity_type",
-    "ActivityName": "activity_name",
-    "ActivityInstanceStartTime_UTC": "activity_start_time",
-    "ActivityInstanceEndTime_UTC": "activity_end_time",
-    "ActivityInstanceStatus": "activity_status",
-    "ActivityInstanceStatusDetails": "activity_status_details"
-}
 
-df_activity.rename(columns=rename_map_activity, inplace=True)
+@st.cache_data(max_entries=MAX_CACHED_EXPORTS, show_spinner=False)
+def cached_store_rollup(path, size, mtime, member_ids, start=None, end=None, names=None):
+    with HistoryStore(path, read_only=True) as store:
+        return store.rollup(start, end, member_ids, names=names)
 
-# Calculate duration in minutes for activities
-df_activity["duration"] = (df_activity["activity_end_time"] - df_activity["activity_start_time"]).dt.total_seconds() / 60
+
+@st.cache_data(max_entries=MAX_CACHED_EXPORTS, show_spinner=False)
+def cached_store_schedule_rollup(path, size, mtime, member_ids, start, end):
+    with HistoryStore(path, read_only=True) as store:
+        return store.schedule_rollup(start, end, member_ids)
+
+
+@st.cache_data(max_entries=MAX_CACHED_EXPORTS, show_spinner=False)
+def cached_store_runs(path, size, mtime, member_ids, start, end, statuses, columns):
+    with HistoryStore(path, read_only=True) as store:
+        return store.runs(start, end, member_ids, statuses, columns=columns)
+
+
+@st.cache_data(max_entries=MAX_CACHED_EXPORTS, show_spinner=False)
+def cached_store_activity_rollup(path, size, mtime, member_ids):
+    with HistoryStore(path, read_only=True) as store:
+        return store.activity_rollup(member_ids), store.automation_dimension(member_ids)
+
+
+if use_database:
+    with profiler.stage("Sync history store") as stage:
+        activity_signature = file_signature(activity_file_path) if os.path.exists(activity_file_path) else None
+        stage.rows_out = cached_store_sync(database_file_path, file_signature(automation_file_path), activity_signature)
+    df_automation = df_rollup = df_daily_rollup = None  # Loaded by the views the store does not serve
+else:
+    # Load Automation Data
+    with profiler.stage("Load automation data") as stage:
+        df_automation = cached_automation_data(*file_signature(automation_file_path), columns=automation_columns)
+        stage.rows_out = len(df_automation)
+
+    # Per-hour and per-day cubes, updated incrementally as runs are appended to the export
+    with profiler.stage("Load automation rollups") as stage:
+        df_rollup = cached_automation_rollup(*file_signature(automation_file_path))
+        df_daily_rollup = cached_automation_rollup(*file_signature(automation_file_path), freq="D")
+        stage.rows_out = len(df_rollup)
 
 # ===================== PAGE CONFIGURATION =====================
 
@@ -91,11 +248,17 @@ st.sidebar.title("Business Unit Selection")
 
 # Initialize mID check variable
 multiple_mIDs_selected = False  
+member_ids = None  # Selected Business Units, None when the data is not filtered
 
 # Check if 'MemberID' column exists and find unique Business Units
-if "MemberID" in df_automation.columns:
+if use_database:
+    unique_mIDs = cached_store_member_ids(*file_signature(database_file_path))
+elif "MemberID" in df_automation.columns:
     unique_mIDs = df_automation["MemberID"].dropna().unique()
+else:
+    unique_mIDs = None
 
+if unique_mIDs is not None:
     if len(unique_mIDs) > 1:  # More than one Business Unit, show dropdown
         selected_mIDs = st.sidebar.multiselect(
             "Select Business Units (mID)", unique_mIDs, default=unique_mIDs
@@ -110,7 +273,11 @@ if "MemberID" in df_automation.columns:
         multiple_mIDs_selected = len(selected_mIDs) > 1
 
         # Filter the dataset based on selected mIDs
-        df_automation = df_automation[df_automation["MemberID"].isin(selected_mIDs)]
+        member_ids = tuple(selected_mIDs)
+        if not use_database:
+            df_automation = select_members(df_automation, member_ids)
+            df_rollup = select_members(df_rollup, member_ids)
+            df_daily_rollup = select_members(df_daily_rollup, member_ids)
 
     else:
         st.sidebar.markdown("### 📌 Single Business Unit Detected")
@@ -120,196 +287,287 @@ else:
     st.sidebar.markdown("### 📌 No Business Unit Column Found")
     st.sidebar.markdown("Proceeding without Business Unit filtering.")
 
+# Sidebar - Per-Business-Unit worker pool (see parallel.py), offered when several BUs are selected
+bu_workers = 0  # Worker processes; 0 computes the tables over the combined selection in this process
+if multiple_mIDs_selected and st.sidebar.toggle(
+    "🧮 Analyse each BU in parallel",
+    key="bu_pool",
+    help="Compute risky hourly automations, delays, rush hours and time-out risks separately for each Business Unit in a pool of worker processes.",
+):
+    bu_workers = st.sidebar.number_input(
+        "Worker processes", min_value=1, max_value=os.cpu_count() or 1, value=min(len(member_ids), os.cpu_count() or 1), key="bu_workers"
+    )
+
+
+def member_analytics():
+    """Return the per-Business-Unit tables of the worker pool, or None when it is off."""
+    if not bu_workers:
+        return None
+    with profiler.stage("Per-BU analytics (worker pool)") as stage:
+        activity_signature = file_signature(activity_file_path) if os.path.exists(activity_file_path) else None
+        tables = cached_member_analytics(file_signature(automation_file_path), activity_signature, member_ids, bu_workers)
+        stage.rows_out = sum(len(table) for table in tables.values())
+    return tables
+
+
+# Sidebar - Data Refresh
+if st.sidebar.button(
+    "🔄 Reload data",
+    help="Drop every cached result and read the exports again. Snapshots, statistics and the database are kept; only rows appended since they were last updated are parsed.",
+):
+    st.cache_data.clear()  # Every cached function above, including ones added later
+    st.cache_resource.clear()  # And the time indexes built over them
+    st.rerun()
+
 # Sidebar Navigation
 st.sidebar.title("Navigation")
 page = st.sidebar.radio("Select Page:", ["Automations", "Automation Activities"])
 
-# ====================== PAGE 1: AUTOMATIONS =======================
-if page == "Automations":
-
-    # --------- STATUS SECTION ---------
-
-    # Layout setup
-    st.markdown("<h2 class='stTitle'>✅ Automation Status</h2>", unsafe_allow_html=True)
-    st.markdown("<p class='stDescription'>Here you can view the statuses of your automation by selecting a timeframe.</p>", unsafe_allow_html=True)
+# Sidebar - Performance panel switch (the panel itself is drawn once the page has run)
+st.sidebar.toggle("⏱️ Performance", key="show_performance", help="Time each stage of this page and show the results below.")
 
-    col1, col2 = st.columns([0.35, 0.65])
+# ===================== TIME INDEXES =====================
 
-    with col1:
-        st.markdown("### Select Timeframe")
-        start_date = pd.to_datetime(st.date_input("Start date", df_automation["start_time"].min().date()))
-        end_date = pd.to_datetime(st.date_input("End date", df_automation["start_time"].max().date()))
-        df_filtered = df_automation[(df_automation["start_time"] >= start_date) & (df_automation["start_time"] <= end_date)]
+if use_database:
+    # Run count, time bounds and names of the selected Business Units, answered by the store
+    run_summary = cached_store_summary(*file_signature(database_file_path), member_ids)
+else:
+    run_summary = {
+        "runs": len(df_automation),
+        "first_start": df_automation["start_time"].min(),
+        "last_start": df_automation["start_time"].max(),
+        "last_scheduled": df_automation["scheduled_time"].max(),
+        "names": df_automation["name"].unique(),
+    }
+
+    # Time-sorted indexes over the selected Business Units; date ranges become binary searches
+    with profiler.stage("Build time indexes", rows_in=len(df_automation)):
+        automation_index, daily_index, schedule_index = cached_time_indexes(*file_signature(automation_file_path), member_ids)
+
+
+def selected_runs():
+    """Return the selected Business Units' runs, read from the export snapshot on first use in database mode."""
+    if df_automation is not None:
+        return df_automation
+    with profiler.stage("Load automation data") as stage:
+        df = select_members(cached_automation_data(*file_signature(automation_file_path), columns=automation_columns), member_ids)
+        stage.rows_out = len(df)
+    return df
+
+
+def daily_rollup_between(start=None, end=None, names=None):
+    """Return the daily rollup of the selected Business Units' runs starting in ``[start, end)``."""
+    if use_database:
+        return cached_store_rollup(*file_signature(database_file_path), member_ids, start, end, names)
+    if names is not None:
+        return pd.concat([daily_index.rows_for(name) for name in names])
+    return daily_index.between(start, end)
 
-    with col2:
-        status_counts = df_filtered["status"].value_counts().reset_index()
-        status_counts.columns = ["Status", "Count"]
-        st.markdown("<h3 class='chart-title' style='text-align: center;'>Automation Status Distribution</h3>", unsafe_allow_html=True)
-        fig = px.pie(status_counts, names="Status", values="Count")
-        st.plotly_chart(fig, use_container_width=True)
+# ====================== PAGE 1: AUTOMATIONS =======================
+if page == "Automations":
 
-    col1, col2 = st.columns([0.35, 0.65])
+    # Every section is a fragment: its widgets rerun that section only, not the whole page
 
-    with col1:
-        st.markdown("<div style='padding-top: 30px;'></div>", unsafe_allow_html=True)  # Adjust padding as needed
-        selected_status = st.selectbox(
-            "View Automation Details for:", 
-            status_counts["Status"].unique()
-        )
+    # --------- STATUS SECTION ---------
 
-    with col2:
-        if selected_status:
-            # Define columns to display based on selection
-            columns_to_display = ["name", "start_time", "end_time", "status"]
-            
-            if multiple_mIDs_selected:  
-                columns_to_display.append("MemberID")  # Add mID column when multiple BUs are selected
-            
-            if selected_status == "Error":  
-                columns_to_display.append("error")  # Add error column only if "Error" is selected
-            
-            error_data = df_filtered[df_filtered["status"] == selected_status][columns_to_display]
-            
-            st.markdown(f"<h3 class='chart-title' style='text-align: center;'>Automations with Status: {selected_status}</h3>", unsafe_allow_html=True)
-            st.dataframe(error_data, hide_index=True, use_container_width=True)
+    @st.fragment
+    def status_section():
+        # Layout setup
+        st.markdown("<h2 class='stTitle'>✅ Automation Status</h2>", unsafe_allow_html=True)
+        st.markdown("<p class='stDescription'>Here you can view the statuses of your automation by selecting a timeframe.</p>", unsafe_allow_html=True)
+
+        col1, col2 = st.columns([0.35, 0.65])
+
+        with col1:
+            st.markdown("### Select Timeframe")
+            start_date = pd.to_datetime(st.date_input("Start date", run_summary["first_start"].date()))
+            end_date = pd.to_datetime(st.date_input("End date", run_summary["last_start"].date()))
+
+        with col2:
+            with profiler.stage("Status counts") as stage:
+                df_status_counts = status_counts(daily_rollup_between(start_date, end_date + pd.Timedelta(days=1)))
+                stage.rows_out = len(df_status_counts)
+            st.markdown("<h3 class='chart-title' style='text-align: center;'>Automation Status Distribution</h3>", unsafe_allow_html=True)
+            with profiler.stage("Figure: status pie", rows_in=len(df_status_counts)):
+                fig = px.pie(df_status_counts, names="Status", values="Count")
+            with profiler.stage("Render: status pie"):
+                st.plotly_chart(fig, use_container_width=True)
+
+        col1, col2 = st.columns([0.35, 0.65])
+
+        with col1:
+            st.markdown("<div style='padding-top: 30px;'></div>", unsafe_allow_html=True)  # Adjust padding as needed
+            selected_status = st.selectbox(
+                "View Automation Details for:", 
+                df_status_counts["Status"].unique()
+            )
+
+        with col2:
+            if selected_status:
+                # Define columns to display based on selection
+                columns_to_display = ["name", "start_time", "end_time", "status"]
+                
+                if multiple_mIDs_selected:  
+                    columns_to_display.append("MemberID")  # Add mID column when multiple BUs are selected
+                
+                if selected_status == "Error":
+                    columns_to_display.append("error")  # Add error column only if "Error" is selected
+
+                with profiler.stage("Status details") as stage:
+                    if use_database:
+                        # Date range, BUs and status are filtered in SQL; only the shown columns are read
+                        error_data = cached_store_runs(
+                            *file_signature(database_file_path), member_ids,
+                            start_date, end_date + pd.Timedelta(days=1), (selected_status,), tuple(columns_to_display),
+                        )
+                        stage.rows_in = len(error_data)
+                    else:
+                        df_filtered = automation_index.between(start_date, end_date + pd.Timedelta(days=1))
+                        error_data = df_filtered[df_filtered["status"] == selected_status]
+
+                        if selected_status == "Error":
+                            # Rows keep their position in the export, so the error text lines up by index
+                            df_errors = cached_automation_data(*file_signature(automation_file_path), columns=["error"])
+                            error_data = error_data.join(df_errors)
+                        stage.rows_in = len(df_filtered)
+
+                    error_data = error_data[columns_to_display]
+                    stage.rows_out = len(error_data)
+                
+                st.markdown(f"<h3 class='chart-title' style='text-align: center;'>Automations with Status: {selected_status}</h3>", unsafe_allow_html=True)
+                with profiler.stage("Render: status details", rows_in=len(error_data)):
+                    paged_table(error_data, key="status_details")
+
+    status_section()
 
     # --------- PERFORMANCE ANALYSIS SECTION ---------
 
     st.markdown("## 🏎️ Performance Analysis")
     st.markdown("<p class='stDescription'>Compare automation performance over different timeframes.</p>", unsafe_allow_html=True)
 
-    # Select automation for trend analysis
-    selected_automation = st.selectbox("Select an Automation to Analyze Performance Over Time", df_automation["name"].unique())
+    @st.fragment
+    def trend_section():
+        # Select automation for trend analysis
+        selected_automation = st.selectbox("Select an Automation to Analyze Performance Over Time", run_summary["names"])
 
-    # Precompute "week" column for the entire DataFrame (avoiding redundant computation)
-    df_automation["week"] = df_automation["start_time"].dt.to_period("W").astype(str)
+        # Compute the weekly average duration from the daily rollup
+        with profiler.stage("Weekly trend") as stage:
+            weekly_avg_duration = weekly_average_duration(daily_rollup_between(names=(selected_automation,)))
+            stage.rows_out = len(weekly_avg_duration)
 
-    # Filter only once
-    df_perf_trend = df_automation[df_automation["name"] == selected_automation]
+        with profiler.stage("Figure: weekly trend", rows_in=len(weekly_avg_duration)):
+            fig = px.line(weekly_avg_duration, x="week", y="duration", title=f"📈 Performance Trend Over Time: {selected_automation}")
+        with profiler.stage("Render: weekly trend"):
+            st.plotly_chart(fig)
 
-    # Compute the weekly average duration
-    weekly_avg_duration = df_perf_trend.groupby("week")["duration"].mean().reset_index()
+    trend_section()
 
+    @st.fragment
+    def comparison_section():
+        col1, col2 = st.columns(2)
 
-    fig = px.line(weekly_avg_duration, x="week", y="duration", title=f"📈 Performance Trend Over Time: {selected_automation}")
-    st.plotly_chart(fig)
+        # Define default timeframes
+        end_of_last_month = datetime.today().replace(day=1) - timedelta(days=1)
+        start_of_last_month = end_of_last_month.replace(day=1)
+        one_week_last_month_start = start_of_last_month
+        one_week_last_month_end = start_of_last_month + timedelta(days=6)
 
-    col1, col2 = st.columns(2)
+        last_week_start = datetime.today() - timedelta(days=7)
+        last_week_end = datetime.today()
 
-    # Define default timeframes
-    end_of_last_month = datetime.today().replace(day=1) - timedelta(days=1)
-    start_of_last_month = end_of_last_month.replace(day=1)
-    one_week_last_month_start = start_of_last_month
-    one_week_last_month_end = start_of_last_month + timedelta(days=6)
+        # Define base columns
+        columns_to_display = ["name"]
 
-    last_week_start = datetime.today() - timedelta(days=7)
-    last_week_end = datetime.today()
+        if multiple_mIDs_selected:
+            columns_to_display.append("MemberID")  # Include mID if multiple BUs are selected
 
-    with col2:
-        st.markdown("### 📊 Compare Performance Across Timeframes")
-        timeframe_1 = st.date_input("Select First Timeframe Start", one_week_last_month_start.date())
-        timeframe_1_end = st.date_input("Select First Timeframe End", one_week_last_month_end.date())
+        with col2:
+            st.markdown("### 📊 Compare Performance Across Timeframes")
+            timeframe_1 = st.date_input("Select First Timeframe Start", one_week_last_month_start.date())
+            timeframe_1_end = st.date_input("Select First Timeframe End", one_week_last_month_end.date())
 
-        timeframe_2 = st.date_input("Select Second Timeframe Start", last_week_start.date())
-        timeframe_2_end = st.date_input("Select Second Timeframe End", last_week_end.date())
+            timeframe_2 = st.date_input("Select Second Timeframe Start", last_week_start.date())
+            timeframe_2_end = st.date_input("Select Second Timeframe End", last_week_end.date())
 
-        # Ensure the first timeframe is earlier than the second
-        if timeframe_1_end >= timeframe_2:
-            st.error("The first timeframe must be earlier than the second timeframe. Please adjust your selection.")
-            df1, df2 = pd.DataFrame(), pd.DataFrame()  # Set empty DataFrames to avoid further processing
-        else:
-            # Convert to datetime
-            timeframe_1, timeframe_1_end = pd.to_datetime(timeframe_1), pd.to_datetime(timeframe_1_end)
-            timeframe_2, timeframe_2_end = pd.to_datetime(timeframe_2), pd.to_datetime(timeframe_2_end)
+            # Ensure the first timeframe is earlier than the second
+            if timeframe_1_end >= timeframe_2:
+                st.error("The first timeframe must be earlier than the second timeframe. Please adjust your selection.")
+                df1, df2 = pd.DataFrame(), pd.DataFrame()  # Set empty DataFrames to avoid further processing
+            else:
+                # Convert to datetime
+                timeframe_1, timeframe_1_end = pd.to_datetime(timeframe_1), pd.to_datetime(timeframe_1_end)
+                timeframe_2, timeframe_2_end = pd.to_datetime(timeframe_2), pd.to_datetime(timeframe_2_end)
+
+                # Slice the daily rollup for each timeframe (end dates included)
+                df1 = daily_rollup_between(timeframe_1, timeframe_1_end + pd.Timedelta(days=1))
+                df2 = daily_rollup_between(timeframe_2, timeframe_2_end + pd.Timedelta(days=1))
+
+        with col1:
+            st.markdown("### 📋 Individual Automation Comparison")
+            st.markdown("<p class='stDescription'>Compare avg automation duration between two timeframes. The second must be more recent.</p>", unsafe_allow_html=True)
+
+            if not df1.empty and not df2.empty:
+                # Compare average durations between both timeframes
+                with profiler.stage("Timeframe comparison", rows_in=len(df1) + len(df2)) as stage:
+                    comparison_df = compare_timeframes(df1, df2, columns_to_display)
+                    stage.rows_out = len(comparison_df)
+
+                if not comparison_df.empty:
+                    # Highlight increased durations (styled a page at a time)
+                    with profiler.stage("Render: timeframe comparison", rows_in=len(comparison_df)):
+                        paged_table(
+                            comparison_df,
+                            key="comparison",
+                            highlight=lambda page: page["Avg Duration (Second)"] > page["Avg Duration (First)"],
+                            hide_index=False,
+                            height=280,
+                        )
+                else:
+                    st.write("No significant data available for selected timeframes.")
+            else:
+                st.write("No data available for selected timeframes.")
 
-            # Filter Data Based on Selected Timeframes
-            df1 = df_automation[(df_automation["start_time"] >= timeframe_1) & (df_automation["start_time"] <= timeframe_1_end)]
-            df2 = df_automation[(df_automation["start_time"] >= timeframe_2) & (df_automation["start_time"] <= timeframe_2_end)]
+    comparison_section()
 
-    with col1:
-        st.markdown("### 📋 Individual Automation Comparison")
-        st.markdown("<p class='stDescription'>Compare avg automation duration between two timeframes. The second must be more recent.</p>", unsafe_allow_html=True)
-
-        if not df1.empty and not df2.empty:
-            # Define base columns
-            columns_to_display = ["name"]
-
-            if multiple_mIDs_selected:
-                columns_to_display.append("MemberID")  # Include mID if multiple BUs are selected
-
-            # Compute average durations for each timeframe
-            df1_avg = df1.groupby(columns_to_display)["duration"].mean().reset_index().rename(columns={"duration": "Avg Duration (First)"})
-            df2_avg = df2.groupby(columns_to_display)["duration"].mean().reset_index().rename(columns={"duration": "Avg Duration (Second)"})
-
-            # Merge both timeframes
-            comparison_df = pd.merge(df1_avg, df2_avg, on=columns_to_display, how="outer").fillna(0)
-            
-            # Remove automations with zero average duration
-            comparison_df = comparison_df[(comparison_df["Avg Duration (First)"] > 0) | (comparison_df["Avg Duration (Second)"] > 0)]
-            
-            # Apply styling to highlight increased durations
-            def highlight_increase(row):
-                if row["Avg Duration (Second)"] > row["Avg Duration (First)"]:
-                    return ["background-color: lightcoral"] * len(row)
-                return [""] * len(row)
-
-            if not comparison_df.empty:
-                st.dataframe(comparison_df.style.apply(highlight_increase, axis=1), height=280)
-            else:
-                st.write("No significant data available for selected timeframes.")
-        else:
-            st.write("No data available for selected timeframes.")
+    # Automations whose recent runs are slow against their own history
+    with profiler.stage("Regressed automations") as stage:
+        df_stats, df_sketch = cached_automation_stats(*file_signature(automation_file_path))
+        df_regressed = find_regressed_automations(select_members(df_stats, member_ids), select_members(df_sketch, member_ids))
+        stage.rows_in, stage.rows_out = len(df_stats), len(df_regressed)
 
-    # Processes for Risky Hourly Automations
-    # Step 1: Identify two distinct one-day timeframes from last week's data
-    last_week_start = df_automation["start_time"].max() - pd.Timedelta(days=7)
-    df_last_week = df_automation[df_automation["start_time"] >= last_week_start]
-
-    unique_dates = df_last_week["start_time"].dt.date.unique()
-    selected_dates = unique_dates[-2:] if len(unique_dates) >= 2 else unique_dates
-
-    # Step 2: Find hourly automations (48+ occurrences in 2 selected days)
-    hourly_automations = (
-        df_last_week[df_last_week["start_time"].dt.date.isin(selected_dates)]
-        .groupby("name")["start_time"]
-        .count()
-        .reset_index()
-    )
-    hourly_automations = hourly_automations[hourly_automations["start_time"] >= 48]["name"]
+    st.markdown("### 📉 Most Regressed Automations")
+    st.markdown("<p class='stDescription'>Recent duration (weighted towards the latest runs) against each automation's long-run average, in standard deviations.</p>", unsafe_allow_html=True)
+    if df_regressed.empty:
+        st.write("✅ No automation is running slower than usual.")
+    else:
+        with profiler.stage("Render: regressed automations", rows_in=len(df_regressed)):
+            st.dataframe(df_regressed, hide_index=True, use_container_width=True)
 
-    # Step 3: Check if their last X occurrences meet the conditions
+    # Processes for Risky Hourly Automations
     REQUIRED_OCCURRENCES = 2  # You can adjust the threshold for # of times ≥ 51 min
-    TOTAL_INSTANCES = 30  # You can adjust the threshold for # of times to check 
-
-    automation_summary = []
-    for automation in hourly_automations:
-        last_30_durations = (
-            df_automation[df_automation["name"] == automation]
-            .sort_values(by="start_time", ascending=False)
-            .head(TOTAL_INSTANCES)["duration"]
-        )
+    TOTAL_INSTANCES = 30  # You can adjust the threshold for # of times to check
+    RISKY_DURATION_MINUTES = 51  # You can adjust the duration that counts as close to 1 hour
 
-        avg_duration = last_30_durations.mean()
-        count_over_51 = (last_30_durations >= 51).sum()
+    # With the worker pool on, these tables come per Business Unit from parallel.analyze_by_member
+    member_tables = member_analytics()
 
-        if avg_duration > 51:
-            reason = "Avg duration is above 51 min"
-        elif count_over_51 >= REQUIRED_OCCURRENCES:
-            reason = f"There have been {count_over_51} occurrences over 51 min"
+    with profiler.stage("Risky hourly automations", rows_in=run_summary["runs"]) as stage:
+        if member_tables is not None:
+            df_valid_automations = member_tables["risky_hourly"]
         else:
-            continue  # Skip if neither condition is met
-
-        automation_summary.append({"Automation Name": automation, "Reason": reason})
-
-    # Convert to DataFrame
-    df_valid_automations = pd.DataFrame(automation_summary)
-
-    # Calculate average delay while handling missing values
-    df_automation["delay_minutes"] = ((df_automation["start_time"] - df_automation["scheduled_time"]).dt.total_seconds() / 60).fillna(0)
-
-    # Compute average delay per automation and exclude duplicates
-    df_avg_delay = df_automation.dropna(subset=["scheduled_time"]).groupby("name")["delay_minutes"].mean().reset_index()
-    df_avg_delay.rename(columns={"name": "Automation Name", "delay_minutes": "Avg Delay (minutes)"}, inplace=True)
+            df_valid_automations = cached_risky_hourly_automations(
+                *file_signature(automation_file_path),
+                member_ids,
+                required_occurrences=REQUIRED_OCCURRENCES,
+                total_instances=TOTAL_INSTANCES,
+                duration_threshold=RISKY_DURATION_MINUTES,
+            )
+        stage.rows_out = len(df_valid_automations)
+
+    # Compute average delay per automation from the daily rollup
+    with profiler.stage("Delayed automations") as stage:
+        df_avg_delay = member_tables["delays"] if member_tables is not None else find_delayed_automations(daily_rollup_between())
+        stage.rows_out = len(df_avg_delay)
 
     # Step 4: Display Results in Two Columns
     col1, col2 = st.columns([0.5, 0.5])
@@ -321,87 +579,61 @@ if page == "Automations":
         if df_valid_automations.empty:
             st.write("No automation found for this criteria.")
         else:
-            st.dataframe(df_valid_automations, hide_index=True, use_container_width=True)
+            with profiler.stage("Render: risky hourly automations", rows_in=len(df_valid_automations)):
+                st.dataframe(df_valid_automations, hide_index=True, use_container_width=True)
 
     with col2:
         st.markdown("### ⏳ Delayed Automations (Avg Delay)")
         st.markdown("<p class='stDescription'>Average delay duration for all automations.</p>", unsafe_allow_html=True)
-        st.dataframe(df_avg_delay, hide_index=True, use_container_width=True)
+        with profiler.stage("Render: delayed automations", rows_in=len(df_avg_delay)):
+            paged_table(df_avg_delay, key="delays")
 
     # --------- SCHEDULE SECTION ---------
 
     # Determine the start and end of the previous month
-    selected_month_start = (df_automation["scheduled_time"].max() - pd.DateOffset(months=1)).replace(day=1)
-    selected_month_end = selected_month_start + pd.DateOffset(months=1) - pd.Timedelta(days=1)  # Last day of the month
+    selected_month_start, selected_month_end = previous_month(run_summary["last_scheduled"])
 
-    # Filter data for the selected month (by both YEAR and MONTH)
-    df_last_month = df_automation[
-        (df_automation["scheduled_time"] >= selected_month_start) &
-        (df_automation["scheduled_time"] <= selected_month_end)
-    ]
+    # Filter the rollup for the selected month (by both YEAR and MONTH)
+    if use_database:
+        df_last_month = cached_store_schedule_rollup(
+            *file_signature(database_file_path), member_ids, selected_month_start, selected_month_start + pd.DateOffset(months=1)
+        )
+    else:
+        df_last_month = schedule_index.between(selected_month_start, selected_month_start + pd.DateOffset(months=1))
 
     # Schedule Title
     st.markdown(f"## 📅 Schedule ({selected_month_start.strftime('%B %d, %Y')} - {selected_month_end.strftime('%B %d, %Y')})")
 
     # Find rush hours: count automations for each hour slot within the selected month
-    df_last_month = df_last_month.copy()  # Ensures we are working with a separate DataFrame
-    df_last_month["hour_slot"] = df_last_month["scheduled_time"].dt.strftime("%Y-%m-%d %H:00")
-    rush_hours = df_last_month.groupby("hour_slot")["name"].agg(["count", list]).reset_index()
-    rush_hours.columns = ["Hour Slot", "Automation_Count", "Automation_Names"]
-    rush_hours = rush_hours[rush_hours["Automation_Count"] >= 3]
-
-    # Find overlapping automations
-    overlaps = []
-
-    # Perform a self-join to compare all automations
-    overlaps_df = df_automation.merge(df_automation, how="cross", suffixes=("_1", "_2"))
-
-    # Remove self-comparisons (same automation instance)
-    overlaps_df = overlaps_df[overlaps_df["start_time_1"] != overlaps_df["start_time_2"]]
-
-    # Identify overlapping automations
-    overlaps_df = overlaps_df[
-        (overlaps_df["end_time_1"] > overlaps_df["start_time_2"]) &  # End of one overlaps with start of another
-        (overlaps_df["start_time_1"] < overlaps_df["end_time_2"])    # Start of one overlaps with end of another
-    ]
-
-    # Compute overlap duration in minutes
-    overlaps_df["Overlap_Minutes"] = (
-        (overlaps_df[["end_time_1", "end_time_2"]].min(axis=1) - 
-         overlaps_df[["start_time_1", "start_time_2"]].max(axis=1))
-        .dt.total_seconds() / 60
-    )
-
-    # Sort automation names to ensure consistent ordering
-    overlaps_df["Automation_Pair"] = overlaps_df.apply(
-        lambda row: frozenset([row["name_1"], row["name_2"]]), axis=1
-    )
-
-    # Group by Automation_Pair to ensure only one row per pair
-    overlaps_df = overlaps_df.sort_values("Overlap_Minutes", ascending=False).groupby("Automation_Pair").first().reset_index()
-
-    # Extract automation names again from the frozenset
-    overlaps_df["Automation_1"], overlaps_df["Automation_2"] = zip(*overlaps_df["Automation_Pair"])
-
-    # Select relevant columns
-    overlaps_df = overlaps_df[[
-        "Automation_1", "start_time_1", "end_time_1", 
-        "Automation_2", "start_time_2", "end_time_2", 
-        "Overlap_Minutes"
-    ]]
-
-    # Rename columns for clarity
-    overlaps_df.rename(columns={
-        "start_time_1": "Automation 1 Start",
-        "end_time_1": "Automation 1 End",
-        "start_time_2": "Automation 2 Start",
-        "end_time_2": "Automation 2 End"
-    }, inplace=True)
+    with profiler.stage("Rush hours", rows_in=len(df_last_month)) as stage:
+        rush_hours = member_tables["rush_hours"] if member_tables is not None else find_rush_hours(df_last_month)
+        stage.rows_out = len(rush_hours)
 
     # Display Results in Full Width
     st.markdown("### ⏳ Rush Hours")
     st.markdown("<p class='stDescription'>Displays time slots with the highest automation activity.</p>", unsafe_allow_html=True)
-    st.dataframe(rush_hours, hide_index=True, use_container_width=True)
+    with profiler.stage("Render: rush hours", rows_in=len(rush_hours)):
+        st.dataframe(rush_hours, hide_index=True, use_container_width=True)
+
+    @st.fragment
+    def concurrency_section():
+        st.markdown("### 🔀 Concurrency")
+        st.markdown("<p class='stDescription'>Most automations running at the same time, over the whole history.</p>", unsafe_allow_html=True)
+        granularity = st.radio("Time slot:", list(CONCURRENCY_FREQS), index=1, horizontal=True, key="concurrency_freq")
+
+        with profiler.stage("Concurrency", rows_in=run_summary["runs"]) as stage:
+            daily_peaks, peak_slots = cached_concurrency(*file_signature(automation_file_path), member_ids, CONCURRENCY_FREQS[granularity])
+            stage.rows_out = len(peak_slots)
+
+        if peak_slots.empty:
+            st.info("No completed automation runs to profile.")
+            return
+        fig = px.line(daily_peaks, x="slot", y="peak", labels={"slot": "Day", "peak": "Peak Concurrency"})
+        st.plotly_chart(fig, use_container_width=True)
+        with profiler.stage("Render: concurrency", rows_in=len(peak_slots)):
+            st.dataframe(peak_slots, hide_index=True, use_container_width=True)
+
+    concurrency_section()
 
     st.markdown("""
         <style>
@@ -410,63 +642,117 @@ if page == "Automations":
         </style>
     """, unsafe_allow_html=True)
 
-    st.markdown("<div class='overlap-container'>", unsafe_allow_html=True)
-    st.markdown("### 🔄 Overlapping Automations")
-    st.markdown("<p class='stDescription'>Displays pairs of automations that run simultaneously, potentially causing conflicts or delays.</p>", unsafe_allow_html=True)
-
-    # Ensure dataframe is not empty before displaying
-    if not overlaps_df.empty:
-        # Format table with better timestamp readability
-        formatted_df = overlaps_df.style.format({
-            "Automation 1 Start": lambda x: x.strftime("%Y-%m-%d %H:%M"),
-            "Automation 1 End": lambda x: x.strftime("%Y-%m-%d %H:%M"),
-            "Automation 2 Start": lambda x: x.strftime("%Y-%m-%d %H:%M"),
-            "Automation 2 End": lambda x: x.strftime("%Y-%m-%d %H:%M"),
-            "Overlap_Minutes": "{:.1f} min"
-        })
-        
-        st.dataframe(formatted_df, hide_index=True, use_container_width=True)
-    else:
-        st.info("✅ No overlapping automations detected.")
-    st.markdown("</div>", unsafe_allow_html=True)
-
-    # Prepare Data for Gantt Chart
-    df_timeline = df_automation[["name", "start_time", "end_time", "MemberID"]].copy()
-    df_timeline["duration_minutes"] = (df_timeline["end_time"] - df_timeline["start_time"]).dt.total_seconds() / 60
-
-    # Check if multiple mIDs are selected
-    multiple_mIDs_selected = df_automation["MemberID"].nunique() > 1
-
-    # Modify names only if multiple mIDs exist
-    if multiple_mIDs_selected:
-        df_timeline["display_name"] = df_timeline["MemberID"].astype(str) + " | " + df_timeline["name"]
-    else:
-        df_timeline["display_name"] = df_timeline["name"]  # Keep normal names when only one mID
-
-    # Plot the Timeline (Gantt Chart)
-    fig = px.timeline(
-        df_timeline, 
-        x_start="start_time", 
-        x_end="end_time", 
-        y="display_name",  # Show modified names with mID prefixes only if needed
-        color="name",  # Keep automations colored by name
-        title="",
-        labels={"display_name": "Automation Name", "name": "Automation Name"},
-        hover_data=["duration_minutes", "MemberID"]
-    )
-
-    fig.update_yaxes(categoryorder="total ascending")  # Order by start time
-    fig.update_layout(
-        xaxis=dict(title="Time", tickformat="%Y-%m-%d %H:%M"), 
-        showlegend=True  # Keep legend for automation names
-    )
-
-    # Show in Streamlit
-    st.markdown("### 🕒 Full Automation Timeline")
-    st.plotly_chart(fig, use_container_width=True)
+    # Overlaps and the full timeline cover the whole history, so they are only
+    # computed while their expander is open
+    @st.fragment
+    def overlaps_section():
+        st.markdown("<div class='overlap-container'>", unsafe_allow_html=True)
+        st.markdown("### 🔄 Overlapping Automations")
+        st.markdown("<p class='stDescription'>Displays pairs of automations that run simultaneously, potentially causing conflicts or delays.</p>", unsafe_allow_html=True)
+
+        expander = st.expander("Show overlapping automations", key="overlaps_expander", on_change="rerun")
+        if expander.open:
+            with expander:
+                # Find overlapping automations (sweep over start-sorted instances, longest overlap per pair)
+                with profiler.stage("Overlapping automations", rows_in=run_summary["runs"]) as stage:
+                    overlaps_df = cached_overlaps(*file_signature(automation_file_path), member_ids)
+                    stage.rows_out = len(overlaps_df)
+
+                # Ensure dataframe is not empty before displaying
+                if not overlaps_df.empty:
+                    # Format timestamps and minutes in the browser, a page at a time
+                    timestamp = st.column_config.DatetimeColumn(format="YYYY-MM-DD HH:mm")
+                    column_config = {
+                        "Automation 1 Start": timestamp,
+                        "Automation 1 End": timestamp,
+                        "Automation 2 Start": timestamp,
+                        "Automation 2 End": timestamp,
+                        "Overlap_Minutes": st.column_config.NumberColumn(format="%.1f min"),
+                    }
+
+                    with profiler.stage("Render: overlapping automations", rows_in=len(overlaps_df)):
+                        paged_table(overlaps_df, key="overlaps", column_config=column_config)
+                else:
+                    st.info("✅ No overlapping automations detected.")
+        st.markdown("</div>", unsafe_allow_html=True)
+
+    overlaps_section()
+
+    @st.fragment
+    def timeline_section():
+        st.markdown("### 🕒 Full Automation Timeline")
+
+        expander = st.expander("Show timeline", key="timeline_expander", on_change="rerun")
+        if expander.open:
+            # Time window and bar budget: wide windows are drawn as per-automation bands, narrow ones run by run
+            last_day = run_summary["last_start"].date()
+            col1, col2 = expander.columns([0.7, 0.3])
+            window = col1.date_input(
+                "Time window",
+                (last_day - timedelta(days=TIMELINE_WINDOW_DAYS - 1), last_day),
+                min_value=run_summary["first_start"].date(),
+                max_value=last_day,
+                key="timeline_window",
+            )
+            max_bars = col2.number_input("Bar budget", min_value=100, max_value=50_000, value=TIMELINE_MAX_BARS, step=500, key="timeline_max_bars")
+            if not window:
+                return
+            window_start = pd.to_datetime(window[0])
+            window_end = pd.to_datetime(window[-1]) + pd.Timedelta(days=1)
+
+            # Prepare Data for Gantt Chart (names get mID prefixes only if multiple mIDs exist)
+            df_runs = selected_runs()
+            with profiler.stage("Timeline frame", rows_in=len(df_runs)) as stage:
+                df_timeline = timeline_frame(timeline_window(df_runs, window_start, window_end))
+                df_timeline, band_freq = timeline_level_of_detail(df_timeline, max_bars)
+                stage.rows_out = len(df_timeline)
+
+            if df_timeline.empty:
+                expander.info("No automations ran in this time window.")
+                return
+            if band_freq is None:
+                expander.caption(f"{len(df_timeline):,} runs")
+                hover_data = ["duration_minutes", "MemberID"]
+            else:
+                expander.caption(f"{df_timeline['runs'].sum():,} runs merged into {len(df_timeline):,} bands of {band_freq}; narrow the time window to see single runs")
+                hover_data = ["runs", "busy_minutes", "occupancy_percent", "MemberID"]
+
+            # Plot the Timeline (Gantt Chart)
+            with profiler.stage("Figure: timeline", rows_in=len(df_timeline)):
+                fig = px.timeline(
+                    df_timeline, 
+                    x_start="start_time", 
+                    x_end="end_time", 
+                    y="display_name",  # Show modified names with mID prefixes only if needed
+                    color="name",  # Keep automations colored by name
+                    title="",
+                    labels={"display_name": "Automation Name", "name": "Automation Name"},
+                    hover_data=hover_data
+                )
+
+                fig.update_yaxes(categoryorder="total ascending")  # Order by start time
+                fig.update_layout(
+                    xaxis=dict(title="Time", tickformat="%Y-%m-%d %H:%M", range=[window_start, window_end]), 
+                    showlegend=True  # Keep legend for automation names
+                )
+
+            # Show in Streamlit
+            with profiler.stage("Render: timeline"):
+                expander.plotly_chart(fig, use_container_width=True)
+
+    timeline_section()
 
 # ====================== PAGE 2: AUTOMATION ACTIVITIES =======================
 if page == "Automation Activities":
+    # Load the Automation Activity rollup (and the automation dimension it is joined against)
+    with profiler.stage("Load activity rollup") as stage:
+        if use_database:
+            df_activity_rollup, df_dimension = cached_store_activity_rollup(*file_signature(database_file_path), member_ids)
+        else:
+            df_activity_rollup = cached_activity_rollup(*file_signature(activity_file_path))
+            df_dimension = cached_automation_dimension(*file_signature(automation_file_path), member_ids)
+        stage.rows_out = len(df_activity_rollup)
+
     # --------- PERFORMANCE SECTION ---------
 
     st.markdown("## ⚡ Performance")
@@ -474,62 +760,87 @@ if page == "Automation Activities":
 
     col1, col2 = st.columns([0.5, 0.5])
 
-    # Queries at risk of time-out (activity_type = 300, Avg Duration > 20 min)
-    query_risk = (
-        df_activity[df_activity["activity_type"] == 300]
-        .groupby(["activity_name", "AutomationCustomerKey"])["duration"]
-        .mean()
-        .reset_index()
-    )
-    query_risk = query_risk[query_risk["duration"] > 20]
-
-    # Merge with Automation data using AutomationCustomerKey to get MemberID & Automation Name
-    query_risk = query_risk.merge(df_automation[["AutomationCustomerKey", "MemberID", "name"]], 
-                                  on="AutomationCustomerKey", how="left")
-
-    query_risk.rename(columns={
-        "activity_name": "Activity Name",
-        "name": "Automation Name",
-        "duration": "Avg Duration (minutes)"
-    }, inplace=True)
-
-    # Remove duplicates (each Activity Name should appear only once per Automation & MemberID)
-    query_risk = query_risk.drop_duplicates(subset=["Activity Name", "Automation Name", "MemberID"])
+    # Queries and scripts at risk of time-out (Avg Duration > 20 min), found in one pass
+    with profiler.stage("Time-out risks", rows_in=len(df_activity_rollup)) as stage:
+        member_tables = member_analytics()
+        if member_tables is not None:
+            query_risk, script_risk = member_tables["query_risk"], member_tables["script_risk"]
+        else:
+            timeout_risks = find_timeout_risks(df_activity_rollup, df_dimension)
+            query_risk = timeout_risks[QUERY_ACTIVITY_TYPE]
+            script_risk = timeout_risks[SCRIPT_ACTIVITY_TYPE]
+        stage.rows_out = len(query_risk) + len(script_risk)
 
     with col1:
         st.markdown("### 🛑 Queries at Risk of Time-out")
         if query_risk.empty:
             st.write("✅ No risky queries found.")
         else:
-            st.dataframe(query_risk[["Activity Name", "Automation Name", "MemberID", "Avg Duration (minutes)"]],
-                         hide_index=True, use_container_width=True)
-
-    # Scripts at risk of time-out (activity_type = 423, Avg Duration > 20 min)
-    script_risk = (
-        df_activity[df_activity["activity_type"] == 423]
-        .groupby(["activity_name", "AutomationCustomerKey"])["duration"]
-        .mean()
-        .reset_index()
-    )
-    script_risk = script_risk[script_risk["duration"] > 20]
-
-    # Merge with Automation data using AutomationCustomerKey to get MemberID & Automation Name
-    script_risk = script_risk.merge(df_automation[["AutomationCustomerKey", "MemberID", "name"]], 
-                                    on="AutomationCustomerKey", how="left")
-
-    script_risk.rename(columns={
-        "activity_name": "Activity Name",
-        "name": "Automation Name",
-        "duration": "Avg Duration (minutes)"
-    }, inplace=True)
-
-    # Remove duplicates (each Activity Name should appear only once per Automation & MemberID)
-    script_risk = script_risk.drop_duplicates(subset=["Activity Name", "Automation Name", "MemberID"])
+            with profiler.stage("Render: query risks", rows_in=len(query_risk)):
+                st.dataframe(query_risk, hide_index=True, use_container_width=True)
 
     with col2:
         st.markdown("### ⚠️ Scripts at Risk of Time-out")
         if script_risk.empty:
             st.write("✅ No risky scripts found.")
         else:
-            st.dataframe(script_risk[["Activity Name", "Automation Name", "MemberID", "Avg Duration (minutes)"]],
-                         hide_index=True, use_container_width=True)
+            with profiler.stage("Render: script risks", rows_in=len(script_risk)):
+                st.dataframe(script_risk, hide_index=True, use_container_width=True)
+
+    # --------- CRITICAL PATH SECTION ---------
+
+    @st.fragment
+    def critical_path_section():
+        st.markdown("## 🧭 Critical Path")
+        st.markdown("<p class='stDescription'>Which activity took the most time in the slowest automation runs.</p>", unsafe_allow_html=True)
+
+        # Activity rows are joined to their runs only once this is opened
+        expander = st.expander("Show slowest runs", key="critical_path_expander", on_change="rerun")
+        if not expander.open:
+            return
+        with expander:
+            with profiler.stage("Run breakdown") as stage:
+                breakdown = cached_run_breakdown(file_signature(activity_file_path), file_signature(automation_file_path), member_ids)
+                slowest = find_slowest_steps(breakdown)
+                stage.rows_out = len(slowest)
+
+            if slowest.empty:
+                st.info("No activities could be matched to an automation run.")
+                return
+            with profiler.stage("Render: slowest runs", rows_in=len(slowest)):
+                st.dataframe(slowest.drop(columns="run"), hide_index=True, use_container_width=True)
+
+            # Activity shares of one of the listed runs
+            labels = {
+                run: f"{name} | {start:%Y-%m-%d %H:%M} ({minutes:.1f} min)"
+                for run, name, start, minutes in slowest[["run", "Automation Name", "Run Start", "Run Duration (minutes)"]].itertuples(index=False)
+            }
+            selected_run = st.selectbox("Break down run:", list(labels), format_func=labels.get, key="critical_path_run")
+            steps = breakdown[breakdown["run"] == selected_run].sort_values("Duration (minutes)", ascending=False)
+            fig = px.bar(steps, x="Share of Run (%)", y="Activity Name", orientation="h", hover_data=["Duration (minutes)"])
+            fig.update_yaxes(categoryorder="total ascending")
+            st.plotly_chart(fig, use_container_width=True)
+
+    critical_path_section()
+
+# ===================== PERFORMANCE PANEL =====================
+
+# Stages of the last full run (a section rerunning on its own does not redraw the sidebar)
+profiler.close()
+if profiler.enabled:
+    with st.sidebar.expander("Performance", expanded=True):
+        # Stages are recorded as they finish; list them in the order they started, nested ones indented
+        df_stages = pd.DataFrame(profiler.records, columns=["name", "start_ms", "duration_ms", "rows_in", "rows_out", "peak_memory_delta_mb", "depth"])
+        df_stages = df_stages.sort_values("start_ms", kind="mergesort")
+        df_stages["name"] = ["\u00a0\u00a0\u00a0" * depth + name for name, depth in zip(df_stages["name"], df_stages["depth"])]
+        st.metric("Total time (ms)", f"{df_stages.loc[df_stages['depth'] == 0, 'duration_ms'].sum():,.0f}")
+        st.caption("Peak memory is traced for the whole server process, so it includes other sessions running at the same time.")
+        st.dataframe(
+            df_stages.drop(columns=["start_ms", "depth"]).rename(columns={
+                "name": "Stage", "duration_ms": "Time (ms)", "rows_in": "Rows in",
+                "rows_out": "Rows out", "peak_memory_delta_mb": "Peak memory (MB)",
+            }),
+            hide_index=True, use_container_width=True,
+        )
+        st.download_button("Download JSON", profiler.to_json(), file_name="profile.json", mime="application/json")
+        st.download_button("Download Chrome trace", profiler.to_chrome_trace(), file_name="profile_trace.json", mime="application/json")
@@ -0,0 +1,437 @@
+"""Time and memory-profile the dashboard's computations without Streamlit.
+
+    python benchmark.py --scales 10000 100000 1000000 --output benchmark_results.json
+
+For every scale a synthetic export is generated (see ``synthetic_data.py``), loaded
+through the same loader as the dashboard, and each analytic section is run
+``--repeat`` times for timing plus once under ``tracemalloc`` for its peak memory.
+Results are written as JSON so runs can be compared over time.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from analytics import (
+    CONCURRENCY_FREQS,
+    HOURLY_RUNS,
+    REQUIRED_OCCURRENCES,
+    RISKY_DURATION_MINUTES,
+    TOTAL_INSTANCES,
+    assign_activity_runs,
+    compare_timeframes,
+    concurrency_profile,
+    find_delayed_automations,
+    find_overlaps,
+    find_peak_concurrency,
+    find_regressed_automations,
+    find_risky_hourly_automations,
+    find_rush_hours,
+    find_slowest_steps,
+    find_timeout_risks,
+    previous_month,
+    run_breakdown,
+    timeline_frame,
+    timeline_level_of_detail,
+)
+from loader import (
+    activity_file_path,
+    automation_file_path,
+    load_activity_data,
+    load_activity_rollup,
+    load_automation_data,
+    load_automation_rollup,
+    read_activity_data,
+    read_automation_data,
+    snapshot_path,
+)
+from parallel import analyze_by_member
+from profiling import rows
+from rollup import build_automation_dimension, coarsen_rollup, status_counts, weekly_average_duration
+from stats import fold_stats
+from synthetic_data import generate
+from timeindex import TimeIndex
+
+DEFAULT_SCALES = [10_000, 100_000]
+ACTIVITY_SECTIONS = ["activity_risk", "critical_path", "by_member", "by_member_serial"]  # Sections reported against activity rows
+
+# ===================== SECTIONS =====================
+# Each section mirrors one part of app.py and returns the frame the page would display.
+
+
+def load_dataset(data_dir):
+    """Load both exports the way the dashboard does and build its cubes and indexes."""
+    df_automation = load_automation_data(os.path.join(data_dir, automation_file_path))
+    df_rollup = load_automation_rollup(os.path.join(data_dir, automation_file_path))
+    df_daily_rollup = coarsen_rollup(df_rollup, "D").sort_values("start_period", kind="mergesort")
+    return {
+        "automation": df_automation,
+        "activity": load_activity_data(os.path.join(data_dir, activity_file_path)),
+        "activity_rollup": load_activity_rollup(os.path.join(data_dir, activity_file_path)),
+        "rollup": df_rollup.sort_values("scheduled_hour", kind="mergesort", na_position="last"),
+        "daily_rollup": df_daily_rollup,
+        "automation_index": TimeIndex(df_automation, "start_time"),
+        "daily_index": TimeIndex(df_daily_rollup, "start_period", by="name"),
+    }
+
+
+def _last_days(data, days):
+    end = data["automation"]["start_time"].max().normalize() + pd.Timedelta(days=1)
+    return end - pd.Timedelta(days=days), end
+
+
+def section_status(data):
+    start, end = _last_days(data, 30)
+    df_filtered = data["automation_index"].between(start, end)
+    counts = status_counts(data["daily_index"].between(start, end))
+    return df_filtered[df_filtered["status"] == counts["Status"].iloc[0]]
+
+
+def section_trend(data):
+    busiest = data["automation"]["name"].value_counts().index[0]
+    return weekly_average_duration(data["daily_index"].rows_for(busiest))
+
+
+def section_comparison(data):
+    start, end = _last_days(data, 14)
+    middle = start + pd.Timedelta(days=7)
+    return compare_timeframes(data["daily_index"].between(start, middle), data["daily_index"].between(middle, end), ["name", "MemberID"])
+
+
+def section_risky_hourly(data):
+    return find_risky_hourly_automations(data["automation"])
+
+
+def section_delays(data):
+    return find_delayed_automations(data["daily_rollup"])
+
+
+def section_rush_hours(data):
+    month_start = previous_month(data["automation"]["scheduled_time"].max())[0]
+    df_last_month = TimeIndex(data["rollup"], "scheduled_hour").between(month_start, month_start + pd.DateOffset(months=1))
+    return find_rush_hours(df_last_month)
+
+
+def section_overlaps(data):
+    return find_overlaps(data["automation"])
+
+
+def section_concurrency(data):
+    return find_peak_concurrency(data["automation"])
+
+
+def section_regressed(data):
+    # Folding the statistics is what the first load of an export pays; later loads only add appended runs
+    return find_regressed_automations(*fold_stats(None, data["automation"]))
+
+
+def section_timeline(data):
+    # The whole history, as the chart would get it for the widest time window
+    return timeline_level_of_detail(timeline_frame(data["automation"]))[0]
+
+
+def section_activity_risk(data):
+    timeout_risks = find_timeout_risks(data["activity_rollup"], build_automation_dimension(data["automation"]))
+    return pd.concat(timeout_risks.values(), ignore_index=True)
+
+
+def section_critical_path(data):
+    breakdown = run_breakdown(assign_activity_runs(data["activity"], data["automation"]), data["automation"])
+    return find_slowest_steps(breakdown)
+
+
+def section_by_member(data):
+    return analyze_by_member(data["automation"], data["rollup"], data["activity_rollup"])
+
+
+def section_by_member_serial(data):
+    return analyze_by_member(data["automation"], data["rollup"], data["activity_rollup"], workers=1)
+
+
+SECTIONS = {
+    "status": section_status,
+    "trend": section_trend,
+    "comparison": section_comparison,
+    "risky_hourly": section_risky_hourly,
+    "delays": section_delays,
+    "rush_hours": section_rush_hours,
+    "overlaps": section_overlaps,
+    "concurrency": section_concurrency,
+    "regressed": section_regressed,
+    "timeline": section_timeline,
+    "activity_risk": section_activity_risk,
+    "critical_path": section_critical_path,
+    "by_member": section_by_member,
+    "by_member_serial": section_by_member_serial,
+}
+
+# ===================== CHECKS =====================
+# Slow, obviously correct versions of the optimized computations, run with --check.
+
+
+def brute_force_concurrency(df_automation, freq):
+    """Return ``{slot start: peak}`` counting, at every slot start and run start, the runs with ``start <= t < end``."""
+    df = df_automation.dropna(subset=["start_time", "end_time"])
+    df = df[df["end_time"] >= df["start_time"]]
+    starts, ends = df["start_time"].to_numpy(), df["end_time"].to_numpy()
+    if not len(starts):
+        return {}
+
+    # The count only rises at a run start, so a slot's peak is reached at its start or at one of them
+    slots = pd.date_range(pd.Timestamp(starts.min()).floor(freq), pd.Timestamp(ends.max()), freq=freq)
+    times = np.concatenate([slots.to_numpy(), starts])
+    peaks = {}
+    for t in times:
+        slot = pd.Timestamp(t).floor(freq)
+        peaks[slot] = max(peaks.get(slot, 0), int(((starts <= t) & (ends > t)).sum()))
+    return {slot: peak for slot, peak in peaks.items() if peak > 0}
+
+
+def check_concurrency(data):
+    """Compare ``concurrency_profile`` with ``brute_force_concurrency`` at every slot width; return the wrong slots."""
+    mismatches = []
+    for freq in CONCURRENCY_FREQS.values():
+        profile = concurrency_profile(data["automation"], freq)
+        expected = brute_force_concurrency(data["automation"], freq)
+        actual = dict(zip(profile["slot"], profile["peak"]))
+        for slot in sorted(set(expected) | set(actual)):
+            if expected.get(slot, 0) != actual.get(slot, 0):
+                mismatches.append({"freq": freq, "slot": slot, "expected": expected.get(slot, 0), "actual": actual.get(slot, 0)})
+    return mismatches
+
+
+def with_equal_starts(df_automation, freq="h"):
+    """Return a copy of the runs with start times rounded down to ``freq``, so that many runs share one."""
+    df = df_automation.copy()
+    df["start_time"] = df["start_time"].dt.floor(freq)
+    return df
+
+
+def brute_force_overlaps(df_automation):
+    """Return ``{(name, name): longest overlap in minutes}`` comparing every run with every other run."""
+    df = df_automation.dropna(subset=["start_time", "end_time"])
+    names = df["name"].astype(str).to_numpy()
+    starts, ends = df["start_time"].to_numpy(), df["end_time"].to_numpy()
+
+    pairs = []
+    for i in range(len(df)):
+        # Each run against the runs after it in the frame, so every pair of runs is compared once
+        j = np.arange(i + 1, len(df))
+        j = j[(starts[i] < ends[j]) & (starts[j] < ends[i])]
+        overlap = (np.minimum(ends[i], ends[j]) - np.maximum(starts[i], starts[j])) / np.timedelta64(1, "m")
+        swap = names[j] < names[i]
+        pairs.append(pd.DataFrame({
+            "name_1": np.where(swap, names[j], names[i]),
+            "name_2": np.where(swap, names[i], names[j]),
+            "minutes": overlap,
+        }))
+    if not pairs:
+        return {}
+    longest = pd.concat(pairs).groupby(["name_1", "name_2"])["minutes"].max()
+    return longest.to_dict()
+
+
+def check_overlaps(data):
+    """Compare ``find_overlaps`` with ``brute_force_overlaps``, also with equal start times; return the wrong pairs."""
+    mismatches = []
+    for variant, df in [("export", data["automation"]), ("equal starts", with_equal_starts(data["automation"]))]:
+        overlaps = find_overlaps(df)
+        expected = brute_force_overlaps(df)
+        actual = dict(zip(zip(overlaps["Automation_1"].astype(str), overlaps["Automation_2"].astype(str)), overlaps["Overlap_Minutes"]))
+        for pair in sorted(set(expected) | set(actual)):
+            if pair not in expected or pair not in actual or not np.isclose(expected[pair], actual[pair]):
+                mismatches.append({"data": variant, "pair": pair, "expected": expected.get(pair), "actual": actual.get(pair)})
+    return mismatches
+
+
+RISKY_CHECK_THRESHOLDS = [RISKY_DURATION_MINUTES, 20, 12, 5]  # Lower thresholds flag more automations to compare
+
+
+def brute_force_risky_hourly(
+    df_automation,
+    required_occurrences=REQUIRED_OCCURRENCES,
+    total_instances=TOTAL_INSTANCES,
+    duration_threshold=RISKY_DURATION_MINUTES,
+    hourly_runs=HOURLY_RUNS,
+):
+    """Return ``{name: reason}`` of risky hourly automations, checking one automation at a time.
+
+    Like the original dashboard loop, every hourly automation scans all runs for
+    its own and sorts them latest first; runs that start at the same time keep
+    their order in the frame, and runs without a start time come last.
+    """
+    names = df_automation["name"].astype(str).to_numpy()
+    starts = df_automation["start_time"].to_numpy()
+    durations = df_automation["duration"].astype("float64").to_numpy()
+    last_week_start = np.datetime64(df_automation["start_time"].max() - pd.Timedelta(days=7))
+
+    # Hourly: enough runs over the last two days that had a run in the final week
+    last_week = [k for k in range(len(names)) if starts[k] >= last_week_start]
+    selected_days = sorted({starts[k].astype("datetime64[D]") for k in last_week})[-2:]
+    run_counts = {}
+    for k in last_week:
+        if starts[k].astype("datetime64[D]") in selected_days:
+            run_counts[names[k]] = run_counts.get(names[k], 0) + 1
+
+    def recency(k):
+        return (False, 0) if np.isnat(starts[k]) else (True, starts[k])
+
+    reasons = {}
+    for name, count in run_counts.items():
+        if count < hourly_runs:
+            continue
+        own = sorted([k for k in range(len(names)) if names[k] == name], key=recency, reverse=True)
+        recent = [durations[k] for k in own[:total_instances] if not np.isnan(durations[k])]
+        long_runs = sum(duration >= duration_threshold for duration in recent)
+        if recent and sum(recent) / len(recent) > duration_threshold:
+            reasons[name] = f"Avg duration is above {duration_threshold} min"
+        elif long_runs >= required_occurrences:
+            reasons[name] = f"There have been {long_runs} occurrences over {duration_threshold} min"
+    return reasons
+
+
+def check_risky_hourly(data):
+    """Compare ``find_risky_hourly_automations`` with ``brute_force_risky_hourly``, also with equal start times; return the wrong automations."""
+    mismatches = []
+    for variant, df in [("export", data["automation"]), ("equal starts", with_equal_starts(data["automation"]))]:
+        for threshold in RISKY_CHECK_THRESHOLDS:
+            risky = find_risky_hourly_automations(df, duration_threshold=threshold)
+            expected = brute_force_risky_hourly(df, duration_threshold=threshold)
+            actual = dict(zip(risky["Automation Name"], risky["Reason"]))
+            for name in sorted(set(expected) | set(actual)):
+                if expected.get(name) != actual.get(name):
+                    mismatches.append({"data": variant, "threshold": threshold, "name": name, "expected": expected.get(name), "actual": actual.get(name)})
+    return mismatches
+
+
+CHECKS = {"concurrency": check_concurrency, "overlaps": check_overlaps, "risky_hourly": check_risky_hourly}
+
+
+# ===================== HARNESS =====================
+
+
+def measure(func, repeat):
+    """Run ``func`` ``repeat`` times for timing, then once more under tracemalloc."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, {
+        "seconds": min(timings),
+        "seconds_median": float(np.median(timings)),
+        "seconds_all": timings,
+        "peak_memory_mb": peak / 2**20,
+    }
+
+
+def _clear_snapshots(data_dir):
+    for name in [automation_file_path, activity_file_path]:
+        shutil.rmtree(snapshot_path(os.path.join(data_dir, name)), ignore_errors=True)
+
+
+def run_scale(scale, data_dir, sections, repeat, seed, check=False):
+    """Benchmark one scale and return one result row per measured step.
+
+    With ``check`` the ``CHECKS`` run on the dataset first and any mismatch raises.
+    """
+    automation_path, activity_path = (os.path.join(data_dir, name) for name in [automation_file_path, activity_file_path])
+    if not (os.path.exists(automation_path) and os.path.exists(activity_path)):
+        generate(data_dir, scale, seed=seed)
+
+    results = []
+
+    def record(section, func, rows_in):
+        result, stats = measure(func, repeat)
+        results.append({"scale": scale, "section": section, "rows_in": rows_in, "rows_out": rows(result), **stats})
+        print(f"{scale:>10,} {section:<16} {stats['seconds'] * 1000:10.1f} ms {stats['peak_memory_mb']:10.1f} MB")
+        return result
+
+    # Loading: CSV parsing alone, a cold load that builds the snapshot, and a warm snapshot load
+    record("load_csv", lambda: (read_automation_data(automation_path), read_activity_data(activity_path)), None)
+
+    def cold_load():
+        _clear_snapshots(data_dir)
+        return load_dataset(data_dir)
+
+    record("load_cold", cold_load, None)
+    data = record("load", lambda: load_dataset(data_dir), None)
+
+    if check:
+        for name, func in CHECKS.items():
+            mismatches = func(data)
+            if mismatches:
+                raise AssertionError(f"{name}: {len(mismatches)} mismatches at scale {scale}, e.g. {mismatches[:3]}")
+            print(f"{scale:>10,} check {name:<10} ok")
+
+    rows_in = len(data["automation"])
+    for section in sections:
+        record(section, lambda: SECTIONS[section](data), len(data["activity"]) if section in ACTIVITY_SECTIONS else rows_in)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="Automation runs per dataset")
+    parser.add_argument("--sections", nargs="+", choices=list(SECTIONS), default=list(SECTIONS))
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per section; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=None, help="Keep generated datasets here (one sub-directory per scale)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--check", action="store_true", help="Compare optimized results with brute-force versions first (slow; use small scales)")
+    args = parser.parse_args()
+
+    data_root = args.data_dir or tempfile.mkdtemp(prefix="sfmc-bench-")
+    results = []
+    try:
+        for scale in args.scales:
+            results.extend(run_scale(scale, os.path.join(data_root, str(scale)), args.sections, args.repeat, args.seed, args.check))
+    finally:
+        if args.data_dir is None:
+            shutil.rmtree(data_root, ignore_errors=True)
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,543 @@
+import contextlib
+import hashlib
+import io
+import json
+import os
+import threading
+
+import pandas as pd
+
+from profiling import stage
+from rollup import build_activity_rollup, build_rollup, merge_rollups
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Snapshots are optional, the CSV exports remain the source of truth
+    pa = pq = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the sessions of one server process take turns ingesting
+    fcntl = None
+
+# ===================== EXPORT LAYOUT =====================
+
+# Define file paths
+automation_file_path = "automation_data.csv"  # Ensure this file exists in the working directory
+activity_file_path = "automation_activity_data.csv"  # Ensure this file exists in the working directory
+
+# SFMC exports timestamps like "03/14/2025 01:05:00 PM"
+DATE_FORMAT = "%m/%d/%Y %I:%M:%S %p"
+
+# Define date columns for parsing
+automation_date_columns = [
+    "AutomationInstanceStartTime_UTC",
+    "AutomationInstanceEndTime_UTC",
+    "AutomationInstanceScheduledTime_UTC"
+]
+
+activity_date_columns = [
+    "ActivityInstanceStartTime_UTC",
+    "ActivityInstanceEndTime_UTC"
+]
+
+# Rename columns for consistency
+rename_map_automation = {
+    "AutomationName": "name",
+    "AutomationInstanceStartTime_UTC": "start_time",
+    "AutomationInstanceScheduledTime_UTC": "scheduled_time",
+    "AutomationInstanceEndTime_UTC": "end_time",
+    "AutomationInstanceStatus": "status",
+    "AutomationInstanceActivityErrorDetails": "error"
+}
+
+rename_map_activity = {
+    "AutomationName": "automation_name",
+    "ActivityType": "activity_type",
+    "ActivityName": "activity_name",
+    "ActivityInstanceStartTime_UTC": "activity_start_time",
+    "ActivityInstanceEndTime_UTC": "activity_end_time",
+    "ActivityInstanceStatus": "activity_status",
+    "ActivityInstanceStatusDetails": "activity_status_details"
+}
+
+# Low-cardinality text columns stored as categoricals: each distinct value (e.g. an error
+# message repeated on thousands of runs) is kept once and rows hold small integer codes
+automation_category_columns = ["name", "status", "error", "MemberID", "AutomationCustomerKey"]
+activity_category_columns = [
+    "automation_name", "activity_name", "AutomationCustomerKey", "activity_status", "activity_status_details"
+]
+
+# Minutes fit comfortably in float32; aggregates are summed in float64 (see rollup.build_rollup)
+DURATION_DTYPE = "float32"
+
+# ===================== LOADING =====================
+
+
+def file_signature(path):
+    """Return ``(absolute path, size, mtime)``, which changes whenever the export is replaced."""
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+def read_automation_data(path=automation_file_path):
+    """Read an automation instance export into the typed frame used by the dashboard."""
+    return prepare_automation_data(pd.read_csv(path))
+
+
+def prepare_automation_data(df_automation):
+    """Type raw automation export rows (a whole export or one chunk of it)."""
+    for col in automation_date_columns:
+        df_automation[col] = pd.to_datetime(df_automation[col], format=DATE_FORMAT, errors="coerce")
+
+    df_automation.rename(columns=rename_map_automation, inplace=True)
+
+    # Ensure MemberID is treated as a string if the column exists
+    if "MemberID" in df_automation.columns:
+        member_ids = df_automation["MemberID"]
+        if pd.api.types.is_float_dtype(member_ids):
+            member_ids = member_ids.astype("Int64")  # A chunk with missing IDs is read as float; keep "123", not "123.0"
+        df_automation["MemberID"] = member_ids.astype(str)
+
+    # Calculate duration and start delay in minutes
+    df_automation["duration"] = ((df_automation["end_time"] - df_automation["start_time"]).dt.total_seconds() / 60).astype(DURATION_DTYPE)
+    df_automation["delay_minutes"] = ((df_automation["start_time"] - df_automation["scheduled_time"]).dt.total_seconds() / 60).fillna(0).astype(DURATION_DTYPE)
+
+    return _to_categories(df_automation, automation_category_columns)
+
+
+def read_activity_data(path=activity_file_path):
+    """Read an automation activity export into the typed frame used by the dashboard."""
+    return prepare_activity_data(pd.read_csv(path))
+
+
+def prepare_activity_data(df_activity):
+    """Type raw activity export rows (a whole export or one chunk of it)."""
+    for col in activity_date_columns:
+        df_activity[col] = pd.to_datetime(df_activity[col], format=DATE_FORMAT, errors="coerce")
+
+    df_activity.rename(columns=rename_map_activity, inplace=True)
+
+    # Activity type codes are small integers (e.g. 300 for queries, 423 for scripts)
+    df_activity["activity_type"] = pd.to_numeric(df_activity["activity_type"], errors="coerce").astype("Int16")
+
+    # Calculate duration in minutes for activities
+    df_activity["duration"] = ((df_activity["activity_end_time"] - df_activity["activity_start_time"]).dt.total_seconds() / 60).astype(DURATION_DTYPE)
+
+    return _to_categories(df_activity, activity_category_columns)
+
+
+def _to_categories(df, columns):
+    for col in columns:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+# ===================== COLUMNAR SNAPSHOTS =====================
+
+# A snapshot is a directory of Parquet parts next to the export. Exports only ever
+# grow, so a refresh parses the bytes appended since the last load into a new part.
+# Every update writes new files and commits them by replacing the state file, which
+# lists the parts and rollup file that make up the snapshot; files it does not list
+# are leftovers of an earlier or interrupted update.
+SNAPSHOT_FORMAT = 4  # Bumped whenever the stored parts, rollup or state change shape
+SNAPSHOT_STATE_FILE = "_ingest.json"  # Byte-offset watermark of the export and the committed files
+SNAPSHOT_LOCK_FILE = "_ingest.lock"  # Held while an update is written
+MAX_SNAPSHOT_PARTS = 32  # Parts are compacted into one once there are more than this
+FINGERPRINT_BYTES = 64 * 1024  # Bytes before the watermark that must be unchanged for an append
+INGEST_CHUNK_ROWS = 250_000  # CSV rows parsed at a time; bounds the memory an ingest needs
+
+
+def snapshot_path(csv_path):
+    """Return the directory holding the Parquet snapshot of ``csv_path`` (next to the export)."""
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def _fingerprint(f, offset):
+    f.seek(0)
+    digest = hashlib.sha1(f.readline())
+    f.seek(max(offset - FINGERPRINT_BYTES, 0))
+    digest.update(f.read(offset - f.tell()))
+    return digest.hexdigest()
+
+
+def _is_append(f, size, offset, fingerprint):
+    # True when the first ``offset`` bytes are unchanged and end on a row boundary
+    if size < offset or _fingerprint(f, offset) != fingerprint:
+        return False
+    f.seek(offset - 1)
+    return f.read(1) == b"\n"
+
+
+def _read_state(snapshot_dir):
+    try:
+        with open(os.path.join(snapshot_dir, SNAPSHOT_STATE_FILE)) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if state.get("format") == SNAPSHOT_FORMAT else None
+
+
+def _is_current(state, size, mtime, rollup):
+    return state is not None and (state["size"], state["mtime"]) == (size, mtime) and (state["rollup"] or rollup is None)
+
+
+def _write_state(snapshot_dir, state):
+    tmp_path = os.path.join(snapshot_dir, SNAPSHOT_STATE_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, os.path.join(snapshot_dir, SNAPSHOT_STATE_FILE))
+
+
+def _to_table(df, schema=None):
+    # Categoricals are stored as plain strings (Parquet dictionary-encodes them anyway),
+    # so parts built from different exports never disagree on their dictionaries
+    df = df.astype({col: object for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if schema is not None:
+        return table.cast(schema)
+    # Text columns that are empty in this batch still have to be text in later parts
+    return table.cast(pa.schema([
+        field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in table.schema
+    ], metadata=table.schema.metadata))
+
+
+def _remove_unlisted(snapshot_dir, state):
+    # Files of earlier updates and interrupted ones; a reader that still wanted one reads the new state
+    keep = {SNAPSHOT_STATE_FILE, SNAPSHOT_LOCK_FILE, state["rollup_file"], *state["parts"]}
+    for name in os.listdir(snapshot_dir):
+        if name not in keep:
+            try:
+                os.remove(os.path.join(snapshot_dir, name))
+            except OSError:  # Still open by a reader on Windows; a later update removes it
+                pass
+
+
+_ingest_locks = {}  # Snapshot directory -> lock shared by the sessions of this process
+_ingest_locks_guard = threading.Lock()
+
+
+@contextlib.contextmanager
+def _ingest_lock(snapshot_dir):
+    # One update at a time: a thread lock for the sessions of this process and, where
+    # fcntl exists, a lock file for other processes
+    with _ingest_locks_guard:
+        lock = _ingest_locks.setdefault(snapshot_dir, threading.Lock())
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(snapshot_dir, SNAPSHOT_LOCK_FILE), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class _CsvSlice(io.RawIOBase):
+    """The header line followed by ``length`` bytes of ``f`` from its current position."""
+
+    def __init__(self, f, header, length):
+        self._sources = [(io.BytesIO(header), len(header)), (f, length)]
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self._sources:
+            source, remaining = self._sources[0]
+            data = source.read(min(len(buffer), remaining))
+            if data:
+                buffer[:len(data)] = data
+                self._sources[0] = (source, remaining - len(data))
+                return len(data)
+            self._sources.pop(0)
+        return 0
+
+
+def iter_export(f, prepare, header, length, chunk_rows=INGEST_CHUNK_ROWS):
+    """Yield ``prepare``d frames of ``chunk_rows`` rows parsed from the next ``length`` bytes of ``f``.
+
+    ``header`` is the export's header line, so a chunk of appended rows parses
+    like the start of the file.
+    """
+    stream = io.BufferedReader(_CsvSlice(f, header, length))
+    chunks = pd.read_csv(stream, chunksize=chunk_rows)
+    while True:
+        # Timed per chunk so the caller's work on the previous chunk is not counted
+        with stage("Parse CSV chunk") as timed:
+            chunk = next(chunks, None)
+            if chunk is None:
+                return
+            df = prepare(chunk)
+            timed.rows_out = len(df)
+        yield df
+
+
+def fold_export(csv_path, prepare, rollup, chunk_rows=INGEST_CHUNK_ROWS):
+    """Return ``rollup`` of a whole export, reading it ``chunk_rows`` rows at a time."""
+    with open(csv_path, "rb") as f:
+        header = f.readline()
+        length = os.fstat(f.fileno()).st_size - len(header)
+        folded = None
+        for df in iter_export(f, prepare, header, length, chunk_rows):
+            folded = rollup(df) if folded is None else merge_rollups(folded, rollup(df))
+    return rollup(prepare(pd.read_csv(io.BytesIO(header)))) if folded is None else folded
+
+
+def fold_appended(csv_path, prepare, fold, folded=None, watermark=None, chunk_rows=INGEST_CHUNK_ROWS):
+    """Fold the rows appended to ``csv_path`` since ``watermark`` into ``folded``.
+
+    ``fold(folded, df)`` returns the aggregate with one more chunk of typed rows
+    (``folded`` is None before the first one); chunks arrive in export order.
+    ``watermark`` is the one returned by an earlier call. Without it, or when the
+    export changed other than by appended rows, the whole export is folded again
+    from None. Returns ``(folded, watermark)``.
+    """
+    with open(csv_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        header = f.readline()
+        offset = len(header)
+        if watermark is not None and _is_append(f, size, *watermark):
+            offset = watermark[0]
+        else:
+            folded = None
+
+        f.seek(offset)
+        for df in iter_export(f, prepare, header, size - offset, chunk_rows):
+            folded = fold(folded, df)
+        return folded, (size, _fingerprint(f, size))
+
+
+def _write_rows(f, prepare, header, length, part_path, rollup, schema=None):
+    # Stream the rows into one Parquet part, a row group per chunk, folding each
+    # chunk into the rollup as it goes; nothing larger than a chunk is ever held
+    writer = folded = None
+    try:
+        for df in iter_export(f, prepare, header, length, INGEST_CHUNK_ROWS):
+            table = _to_table(df, schema)
+            if writer is None:
+                schema = table.schema
+                writer = pq.ParquetWriter(part_path, schema)
+            writer.write_table(table)
+            if rollup is not None:
+                folded = rollup(df) if folded is None else merge_rollups(folded, rollup(df))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:  # A header without rows still needs a typed part
+        df = prepare(pd.read_csv(io.BytesIO(header)))
+        pq.write_table(_to_table(df, schema), part_path)
+        folded = rollup(df) if rollup is not None else None
+    return folded
+
+
+def _part_name(generation):
+    return f"part-{generation:05d}.parquet"
+
+
+def _write_rollup(snapshot_dir, folded, generation):
+    name = f"_rollup-{generation:05d}.parquet"
+    pq.write_table(_to_table(folded), os.path.join(snapshot_dir, name))
+    return name
+
+
+def _rebuild(csv_path, snapshot_dir, prepare, rollup, generation):
+    # Everything comes from the export again; the files of the current state stay until the commit
+    part = _part_name(generation)
+    with open(csv_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        header = f.readline()
+        folded = _write_rows(f, prepare, header, size - len(header), os.path.join(snapshot_dir, part), rollup)
+        fingerprint = _fingerprint(f, size)
+
+    rollup_file = _write_rollup(snapshot_dir, folded, generation) if rollup is not None else None
+    return {"offset": size, "fingerprint": fingerprint, "parts": [part], "rollup_file": rollup_file}
+
+
+def _append(csv_path, snapshot_dir, prepare, rollup, state, generation):
+    part = _part_name(generation)
+
+    with open(csv_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        offset = state["offset"]
+
+        # Anything but a clean append (rewrite, truncation, edited history) needs a rebuild
+        if not _is_append(f, size, offset, state["fingerprint"]):
+            return None
+
+        f.seek(0)
+        header = f.readline()
+        f.seek(offset)
+        schema = pq.read_schema(os.path.join(snapshot_dir, state["parts"][0]))
+        try:
+            folded = _write_rows(f, prepare, header, size - offset, os.path.join(snapshot_dir, part), rollup, schema)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            # The new rows do not fit the stored column types
+            return None
+        fingerprint = _fingerprint(f, size)
+
+    rollup_file = None
+    if rollup is not None:
+        stored = pd.read_parquet(os.path.join(snapshot_dir, state["rollup_file"]), engine="pyarrow")
+        rollup_file = _write_rollup(snapshot_dir, merge_rollups(stored, folded), generation)
+    return {"offset": size, "fingerprint": fingerprint, "parts": state["parts"] + [part], "rollup_file": rollup_file}
+
+
+def _compact(snapshot_dir, parts, generation):
+    # Copied a row group at a time, so compacting holds one ingest chunk, never the snapshot
+    part = _part_name(generation)
+    with pq.ParquetWriter(os.path.join(snapshot_dir, part), pq.read_schema(os.path.join(snapshot_dir, parts[0]))) as writer:
+        for name in parts:
+            parquet_file = pq.ParquetFile(os.path.join(snapshot_dir, name), memory_map=True)
+            for i in range(parquet_file.num_row_groups):
+                writer.write_table(parquet_file.read_row_group(i))
+    return part
+
+
+def ingest(csv_path, prepare, rollup=None):
+    """Bring the snapshot of ``csv_path`` up to date and return its state.
+
+    The export is parsed ``INGEST_CHUNK_ROWS`` rows at a time and each chunk, once
+    typed by ``prepare``, is written out and folded into ``rollup`` (additive
+    aggregates of a batch of rows) before the next one is read. Rows appended
+    since the last call become a new part merged into the stored aggregates; any
+    other change to the export rebuilds the snapshot from scratch. Updates take
+    turns under a lock and only take effect when the state file listing their
+    ``parts`` and ``rollup_file`` is replaced, so an interrupted one leaves the
+    previous snapshot in place.
+    """
+    snapshot_dir = snapshot_path(csv_path)
+    _, size, mtime = file_signature(csv_path)
+    state = _read_state(snapshot_dir)
+    if _is_current(state, size, mtime, rollup):
+        return state
+
+    if os.path.exists(snapshot_dir) and not os.path.isdir(snapshot_dir):
+        os.remove(snapshot_dir)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    with _ingest_lock(snapshot_dir):
+        # Another session may have brought the snapshot up to date while this one waited
+        state = _read_state(snapshot_dir)
+        if _is_current(state, size, mtime, rollup):
+            return state
+
+        with stage("Ingest export"):
+            generation = 0 if state is None else state["generation"] + 1
+            update = None
+            if state is not None and state["rollup"] == (rollup is not None):
+                update = _append(csv_path, snapshot_dir, prepare, rollup, state, generation)
+            if update is None:
+                update = _rebuild(csv_path, snapshot_dir, prepare, rollup, generation)
+            state = {
+                "format": SNAPSHOT_FORMAT,
+                "size": size,
+                "mtime": mtime,
+                "rollup": rollup is not None,
+                "generation": generation,
+                **update,
+            }
+            _write_state(snapshot_dir, state)
+
+            if len(state["parts"]) > MAX_SNAPSHOT_PARTS:
+                state = {**state, "generation": generation + 1, "parts": [_compact(snapshot_dir, state["parts"], generation + 1)]}
+                _write_state(snapshot_dir, state)
+            _remove_unlisted(snapshot_dir, state)
+    return state
+
+
+def _read_snapshot(csv_path, prepare, rollup, read):
+    # ``read(snapshot_dir, state)`` loads the files the state lists; if a concurrent
+    # update removed them in the meantime, it is given the new state instead
+    snapshot_dir = snapshot_path(csv_path)
+    try:
+        return read(snapshot_dir, ingest(csv_path, prepare, rollup))
+    except FileNotFoundError:
+        return read(snapshot_dir, ingest(csv_path, prepare, rollup))
+
+
+def _load(csv_path, prepare, columns, category_columns, time_column, rollup=None):
+    if pq is None:
+        with stage("Parse CSV") as timed:
+            df = prepare(pd.read_csv(csv_path))
+            timed.rows_out = len(df)
+        return _sort_by_time(df if columns is None else df[[col for col in columns if col in df.columns]], time_column)
+
+    def read(snapshot_dir, state):
+        # Memory-mapped and column-selective: unrequested columns are never decoded.
+        # Requested columns the export does not have are left out, as when parsing the CSV
+        paths = [os.path.join(snapshot_dir, part) for part in state["parts"]]
+        available = None if columns is None else [col for col in columns if col in pq.read_schema(paths[0]).names]
+        with stage("Read snapshot") as timed:
+            df = pd.read_parquet(
+                paths,
+                engine="pyarrow",
+                columns=available,
+                memory_map=True,
+                read_dictionary=[col for col in category_columns if available is None or col in available],
+            )
+            timed.rows_out = len(df)
+        return df
+
+    df = _read_snapshot(csv_path, prepare, rollup, read)
+    with stage("Sort by time", rows_in=len(df)):
+        return _sort_by_time(_sort_categories(df), time_column)
+
+
+def _load_rollup(csv_path, prepare, rollup, category_columns):
+    if pq is None:
+        return _sort_categories(fold_export(csv_path, prepare, rollup))
+
+    def read(snapshot_dir, state):
+        with stage("Read rollup") as timed:
+            df_rollup = pd.read_parquet(
+                os.path.join(snapshot_dir, state["rollup_file"]), engine="pyarrow", read_dictionary=category_columns
+            )
+            timed.rows_out = len(df_rollup)
+        return df_rollup
+
+    return _sort_categories(_read_snapshot(csv_path, prepare, rollup, read))
+
+
+def _sort_by_time(df, column):
+    # Exports are appended in time order, so this stable sort is close to a linear pass.
+    # The index keeps each row's position in the export for joining columns loaded later.
+    if column not in df.columns:
+        return df
+    return df.sort_values(column, kind="mergesort", na_position="last")
+
+
+def _sort_categories(df):
+    # Dictionaries come back in order of appearance; sorted categories keep group-by output alphabetical
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+    return df
+
+
+def load_automation_data(path=automation_file_path, columns=None):
+    """Load automation instances ordered by start time, parsing only rows the snapshot does not hold yet."""
+    return _load(path, prepare_automation_data, columns, automation_category_columns, "start_time", build_rollup)
+
+
+def load_activity_data(path=activity_file_path, columns=None):
+    """Load activity instances ordered by start time, parsing only rows the snapshot does not hold yet."""
+    return _load(path, prepare_activity_data, columns, activity_category_columns, "activity_start_time", build_activity_rollup)
+
+
+def load_automation_rollup(path=automation_file_path):
+    """Load the per-hour automation cube (see ``rollup.build_rollup``) kept with the snapshot."""
+    return _load_rollup(path, prepare_automation_data, build_rollup, ["name", "MemberID", "status"])
+
+
+def load_activity_rollup(path=activity_file_path):
+    """Load the per-activity duration sums (see ``rollup.build_activity_rollup``) kept with the snapshot.
+
+    Only these aggregates are read, so the activity rows themselves never have to
+    fit in memory.
+    """
+    return _load_rollup(path, prepare_activity_data, build_activity_rollup, ["activity_name", "AutomationCustomerKey"])
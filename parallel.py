@@ -0,0 +1,152 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analytics import (
+    QUERY_ACTIVITY_TYPE,
+    SCRIPT_ACTIVITY_TYPE,
+    find_delayed_automations,
+    find_risky_hourly_automations,
+    find_rush_hours,
+    find_timeout_risks,
+    previous_month,
+)
+from rollup import build_automation_dimension
+from timeindex import TimeIndex
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # Without pyarrow the Business Units are analysed one after another in-process
+    pa = None
+
+# ===================== PER-BUSINESS-UNIT ANALYTICS =====================
+
+# Arrow files are written here so workers map them from RAM where the OS offers it
+SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def analyze_member(df_automation, df_rollup, df_activity_rollup=None, month=None):
+    """Return ``{table name: DataFrame}`` for the runs of a single Business Unit.
+
+    ``df_rollup`` is the hourly cube of the same runs, ``df_activity_rollup`` the
+    activity duration sums of its automations and ``month`` the
+    ``(first day, last day)`` window of the rush hour table, which defaults to
+    the month before the last scheduled run.
+    """
+    month_start = (month or previous_month(df_automation["scheduled_time"].max()))[0]
+    df_last_month = TimeIndex(df_rollup, "scheduled_hour").between(month_start, month_start + pd.DateOffset(months=1))
+
+    tables = {
+        "risky_hourly": find_risky_hourly_automations(df_automation),
+        "delays": find_delayed_automations(df_rollup),
+        "rush_hours": find_rush_hours(df_last_month),
+    }
+    if df_activity_rollup is not None:
+        timeout_risks = find_timeout_risks(df_activity_rollup, build_automation_dimension(df_automation))
+        tables["query_risk"] = timeout_risks[QUERY_ACTIVITY_TYPE]
+        tables["script_risk"] = timeout_risks[SCRIPT_ACTIVITY_TYPE]
+    return tables
+
+
+def _member_positions(member_ids, members):
+    # Stable order by Business Unit: each one becomes a contiguous block that keeps its row order
+    codes = pd.Categorical(member_ids, categories=members).codes
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    targets = np.arange(len(members))
+    starts = np.searchsorted(sorted_codes, targets, side="left")
+    ends = np.searchsorted(sorted_codes, targets, side="right")
+    return order, list(zip(starts.tolist(), (ends - starts).tolist()))
+
+
+def _write_shared(df, order, path):
+    table = pa.Table.from_pandas(df.iloc[order], preserve_index=False)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _read_shared(path, offset, length):
+    # The file is memory-mapped and sliced without copying; only this worker's block is converted
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    return table.slice(offset, length).to_pandas()
+
+
+def _analyze_shared(sources, position, month):
+    frames = {name: _read_shared(path, *blocks[position]) for name, (path, blocks) in sources.items()}
+    return analyze_member(frames["automation"], frames["rollup"], frames.get("activity"), month)
+
+
+def _activity_member_ids(df_activity_rollup, df_automation):
+    # Activities carry no MemberID; their automation's customer key tells which BU ran them
+    members_by_key = (
+        df_automation[["AutomationCustomerKey", "MemberID"]]
+        .drop_duplicates("AutomationCustomerKey")
+        .set_index("AutomationCustomerKey")["MemberID"]
+    )
+    return df_activity_rollup["AutomationCustomerKey"].astype(object).map(members_by_key.astype(object))
+
+
+def analyze_by_member(df_automation, df_rollup, df_activity_rollup=None, workers=None, mp_context=None):
+    """Compute the per-Business-Unit tables of ``analyze_member`` in a pool of processes.
+
+    The runs and both rollups are partitioned by ``MemberID`` and written once as
+    Arrow files that every worker memory-maps, so nothing is pickled on the way
+    in. ``workers`` defaults to the number of CPUs; with one worker (or without
+    pyarrow) the Business Units are processed in this process. Each returned
+    table has a ``MemberID`` column and lists the Business Units in sorted order,
+    whatever the worker count. ``mp_context`` picks how workers are started (see
+    ``multiprocessing.get_context``).
+    """
+    members = sorted(df_automation["MemberID"].dropna().astype(str).unique())
+    month = previous_month(df_automation["scheduled_time"].max())
+    workers = min(workers or os.cpu_count() or 1, max(len(members), 1))
+
+    frames = {"automation": (df_automation, df_automation["MemberID"].astype(str)), "rollup": (df_rollup, df_rollup["MemberID"].astype(str))}
+    if df_activity_rollup is not None:
+        frames["activity"] = (df_activity_rollup, _activity_member_ids(df_activity_rollup, df_automation))
+    positions = {name: _member_positions(member_ids, members) for name, (_, member_ids) in frames.items()}
+
+    if workers <= 1 or pa is None:
+        results = []
+        for position in range(len(members)):
+            member_frames = {}
+            for name, (df, _) in frames.items():
+                order, blocks = positions[name]
+                offset, length = blocks[position]
+                member_frames[name] = df.iloc[order[offset:offset + length]]
+            results.append(analyze_member(member_frames["automation"], member_frames["rollup"], member_frames.get("activity"), month))
+    else:
+        shared_dir = tempfile.mkdtemp(prefix="sfmc-bu-", dir=SHARED_DIR)
+        try:
+            sources = {}
+            for name, (df, _) in frames.items():
+                order, blocks = positions[name]
+                path = os.path.join(shared_dir, f"{name}.arrow")
+                _write_shared(df, order, path)
+                sources[name] = (path, blocks)
+
+            with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as pool:
+                results = list(pool.map(_analyze_shared, [sources] * len(members), range(len(members)), [month] * len(members)))
+        finally:
+            shutil.rmtree(shared_dir, ignore_errors=True)
+
+    return _merge_members(members, results)
+
+
+def _merge_members(members, results):
+    # Concatenate in Business Unit order so the output never depends on scheduling
+    merged = {}
+    for name in (results[0] if results else {}):
+        tables = []
+        for member_id, tables_of_member in zip(members, results):
+            table = tables_of_member[name].copy()
+            if "MemberID" not in table.columns:
+                table.insert(1, "MemberID", member_id)
+            tables.append(table)
+        merged[name] = pd.concat(tables, ignore_index=True)
+    return merged
@@ -0,0 +1,186 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+
+# ===================== STAGE TIMINGS =====================
+
+_active = threading.local()  # Profiler of the script run on this thread, if any
+
+# tracemalloc is process-wide: it runs while any profiler that traces memory is alive
+# and is only stopped by the last of them (and only if a profiler started it)
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False
+
+
+def _acquire_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if _tracing_users == 0:
+            _tracing_started = not tracemalloc.is_tracing()
+            if _tracing_started:
+                tracemalloc.start()
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+
+
+class _Stage:
+    __slots__ = ("name", "rows_in", "rows_out", "start", "memory_start", "peak_seen")
+
+    def __init__(self, name, rows_in):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+
+
+class _NullStage:
+    """Stands in for a stage when profiling is off; setting its row counts is a no-op."""
+
+    __slots__ = ()
+    rows_in = rows_out = property(lambda self: None, lambda self, value: None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_STAGE = _NullStage()
+
+
+class Profiler:
+    """Record wall time, rows in/out and peak memory of named stages.
+
+    Stages nest; each record holds its start offset, duration, depth and the
+    peak of Python allocations above what was allocated when it started (traced
+    with ``tracemalloc``, so memory held by pyarrow is not included). Tracing is
+    process-wide, so with several profilers running at once (e.g. sessions of one
+    Streamlit server) each one's peaks include the others' allocations and may be
+    cut short when another stage starts. A disabled profiler hands out one shared
+    no-op stage, so instrumented code costs a method call per stage.
+    """
+
+    def __init__(self, enabled=True, trace_memory=True):
+        self.enabled = enabled
+        self.records = []
+        self._stack = []
+        self._origin = time.perf_counter()
+        self._tracing = None
+        if enabled and trace_memory:
+            _acquire_tracing()
+            # Released by close(), or when the profiler is collected if a run never gets there
+            self._tracing = weakref.finalize(self, _release_tracing)
+
+    def stage(self, name, rows_in=None):
+        """Return a context manager timing ``name``; set ``rows_out`` on it before it exits."""
+        if not self.enabled:
+            return NULL_STAGE
+        return _StageContext(self, _Stage(name, rows_in))
+
+    def close(self):
+        """Stop tracing memory for this profiler; tracing ends with the last profiler using it."""
+        if self._tracing is not None:
+            self._tracing()  # A finalizer runs once, however often it is called
+
+    def _enter(self, stage):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            # Resetting the peak hides it from the enclosing stage, which keeps it aside instead
+            if self._stack:
+                self._stack[-1].peak_seen = max(self._stack[-1].peak_seen, peak)
+            tracemalloc.reset_peak()
+            stage.memory_start = stage.peak_seen = current
+        else:
+            stage.memory_start = stage.peak_seen = None
+        self._stack.append(stage)
+        stage.start = time.perf_counter()
+
+    def _exit(self, stage):
+        duration = time.perf_counter() - stage.start
+        self._stack.pop()
+
+        peak_delta = None
+        if stage.memory_start is not None and tracemalloc.is_tracing():
+            peak = max(stage.peak_seen, tracemalloc.get_traced_memory()[1])
+            peak_delta = peak - stage.memory_start
+            if self._stack:
+                self._stack[-1].peak_seen = max(self._stack[-1].peak_seen, peak)
+
+        self.records.append({
+            "name": stage.name,
+            "start_ms": (stage.start - self._origin) * 1000,
+            "duration_ms": duration * 1000,
+            "depth": len(self._stack),
+            "rows_in": stage.rows_in,
+            "rows_out": stage.rows_out,
+            "peak_memory_delta_mb": None if peak_delta is None else peak_delta / 2**20,
+            "thread": threading.get_ident(),
+        })
+
+    # ===================== EXPORT =====================
+
+    def to_json(self):
+        """Return the records as a JSON document."""
+        return json.dumps({"records": self.records}, indent=2)
+
+    def to_chrome_trace(self):
+        """Return the records in Chrome's trace event format (chrome://tracing, Perfetto)."""
+        events = [{
+            "name": record["name"],
+            "ph": "X",
+            "ts": record["start_ms"] * 1000,
+            "dur": record["duration_ms"] * 1000,
+            "pid": os.getpid(),
+            "tid": record["thread"],
+            "args": {key: record[key] for key in ["rows_in", "rows_out", "peak_memory_delta_mb"]},
+        } for record in self.records]
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+
+
+class _StageContext:
+    __slots__ = ("_profiler", "_stage")
+
+    def __init__(self, profiler, stage):
+        self._profiler = profiler
+        self._stage = stage
+
+    def __enter__(self):
+        self._profiler._enter(self._stage)
+        return self._stage
+
+    def __exit__(self, *exc):
+        self._profiler._exit(self._stage)
+        return False
+
+
+def activate(profiler):
+    """Make ``profiler`` receive the ``stage`` calls made on this thread (None to stop)."""
+    _active.profiler = profiler
+
+
+def stage(name, rows_in=None):
+    """Time ``name`` with the profiler active on this thread, or do nothing if there is none."""
+    profiler = getattr(_active, "profiler", None)
+    if profiler is None:
+        return NULL_STAGE
+    return profiler.stage(name, rows_in)
+
+
+def rows(value):
+    """Return the row count of a frame-like ``value`` (summed over a dict of tables), or None."""
+    if isinstance(value, dict):
+        return sum(len(table) for table in value.values())
+    return len(value) if hasattr(value, "__len__") else None
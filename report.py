@@ -0,0 +1,189 @@
+"""Compute every dashboard table from the exports without Streamlit.
+
+    python report.py --output-dir report --format parquet
+
+Loads both exports through the same loader as the dashboard, runs each analysis
+in ``analytics.py`` and writes one file per table plus a ``manifest.json``
+listing them. Useful for scheduled health checks and for feeding other tools.
+"""
+import argparse
+import json
+import os
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from analytics import (
+    ACTIVITY_RUN_COLUMNS,
+    QUERY_ACTIVITY_TYPE,
+    SCRIPT_ACTIVITY_TYPE,
+    assign_activity_runs,
+    compare_timeframes,
+    find_delayed_automations,
+    find_overlaps,
+    find_peak_concurrency,
+    find_regressed_automations,
+    find_risky_hourly_automations,
+    find_rush_hours,
+    find_slowest_steps,
+    find_timeout_risks,
+    previous_month,
+    run_breakdown,
+)
+from loader import (
+    activity_file_path,
+    automation_file_path,
+    load_activity_data,
+    load_activity_rollup,
+    load_automation_data,
+    load_automation_rollup,
+)
+from parallel import analyze_by_member
+from rollup import build_automation_dimension, coarsen_rollup, status_counts
+from stats import load_automation_stats
+from timeindex import TimeIndex
+
+FORMATS = ["parquet", "json"]
+COMPARISON_DAYS = 7  # Default length of each compared timeframe
+
+
+def _date(value):
+    return pd.Timestamp(value).normalize()
+
+
+def _filter_members(df, member_ids):
+    return df[df["MemberID"].isin(member_ids)] if member_ids else df
+
+
+def _automation_keys(df):
+    # Exports without a MemberID column are reported per automation only
+    return [col for col in ["name", "MemberID"] if col in df.columns]
+
+
+def _weekly_trend(df_weekly_rollup):
+    sums = df_weekly_rollup.groupby(_automation_keys(df_weekly_rollup) + ["start_period"], observed=True)[["duration_sum", "duration_count"]].sum()
+    sums = sums[sums["duration_count"] > 0]
+    trend = (sums["duration_sum"] / sums["duration_count"]).reset_index(name="Avg Duration (minutes)")
+    return trend.rename(columns={"name": "Automation Name", "start_period": "Week"})
+
+
+def build_report(automation_path, activity_path, member_ids=None, start=None, end=None, first=None, second=None, workers=None):
+    """Return ``{table name: DataFrame}`` with every table the dashboard shows.
+
+    ``start``/``end`` bound the status breakdown (end date included; the whole
+    history by default). ``first`` and ``second`` are ``(start, end)`` date pairs
+    for the timeframe comparison; by default the last ``COMPARISON_DAYS`` days are
+    compared with the ones before.
+
+    With ``workers`` set, the risky hourly, delay, rush hour and time-out risk
+    tables are computed per Business Unit in that many processes (see
+    ``parallel.analyze_by_member``) and get a ``MemberID`` column.
+    """
+    df_automation = _filter_members(load_automation_data(automation_path), member_ids)
+    if df_automation.empty:
+        raise ValueError("No automation runs found for the selected Business Units")
+    df_rollup = _filter_members(load_automation_rollup(automation_path), member_ids)
+    df_hourly_rollup = df_rollup.sort_values("scheduled_hour", kind="mergesort", na_position="last")
+    df_daily_rollup = coarsen_rollup(df_rollup, "D").sort_values("start_period", kind="mergesort")
+    daily_index = TimeIndex(df_daily_rollup, "start_period")
+
+    # Status breakdown
+    status_end = None if end is None else _date(end) + pd.Timedelta(days=1)
+    df_status = daily_index.between(start and _date(start), status_end)
+
+    # Timeframe comparison
+    if first is None or second is None:
+        latest = _date(df_automation["start_time"].max())
+        second = (latest - pd.Timedelta(days=COMPARISON_DAYS - 1), latest)
+        first = (second[0] - pd.Timedelta(days=COMPARISON_DAYS), second[0] - pd.Timedelta(days=1))
+    comparison = compare_timeframes(
+        daily_index.between(_date(first[0]), _date(first[1]) + pd.Timedelta(days=1)),
+        daily_index.between(_date(second[0]), _date(second[1]) + pd.Timedelta(days=1)),
+        _automation_keys(df_rollup),
+    ).rename(columns={"name": "Automation Name"})
+
+    # Rush hours of the previous calendar month
+    month_start = previous_month(df_automation["scheduled_time"].max())[0]
+    df_last_month = TimeIndex(df_hourly_rollup, "scheduled_hour").between(month_start, month_start + pd.DateOffset(months=1))
+
+    df_activity_rollup = None
+    if activity_path is not None and os.path.exists(activity_path):
+        df_activity_rollup = load_activity_rollup(activity_path)
+
+    tables = {
+        "status_counts": status_counts(df_status),
+        "weekly_trend": _weekly_trend(coarsen_rollup(df_rollup, "W")),
+        "comparison": comparison,
+        "overlaps": find_overlaps(df_automation),
+        "concurrency": find_peak_concurrency(df_automation),
+        "regressed": find_regressed_automations(*(_filter_members(df, member_ids) for df in load_automation_stats(automation_path))),
+    }
+    if workers is not None:
+        tables.update(analyze_by_member(df_automation, df_hourly_rollup, df_activity_rollup, workers))
+    else:
+        tables["risky_hourly"] = find_risky_hourly_automations(df_automation)
+        tables["delays"] = find_delayed_automations(df_daily_rollup)
+        tables["rush_hours"] = find_rush_hours(df_last_month)
+        if df_activity_rollup is not None:
+            timeout_risks = find_timeout_risks(df_activity_rollup, build_automation_dimension(df_automation))
+            tables["query_risk"] = timeout_risks[QUERY_ACTIVITY_TYPE]
+            tables["script_risk"] = timeout_risks[SCRIPT_ACTIVITY_TYPE]
+    if df_activity_rollup is not None:
+        df_activity = load_activity_data(activity_path, columns=ACTIVITY_RUN_COLUMNS)
+        breakdown = run_breakdown(assign_activity_runs(df_activity, df_automation), df_automation)
+        tables["slowest_runs"] = find_slowest_steps(breakdown).drop(columns="run")
+    return tables
+
+
+def write_report(tables, output_dir, fmt="parquet"):
+    """Write each table to ``output_dir`` as ``<name>.<fmt>`` and return the manifest."""
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {"created": datetime.now(timezone.utc).isoformat(), "format": fmt, "tables": {}}
+
+    for name, df in tables.items():
+        df = df.reset_index(drop=True)
+        # Categorical columns are written as plain values so every reader sees the same type
+        df = df.astype({col: df[col].dtype.categories.dtype for col in df.select_dtypes("category").columns})
+        path = os.path.join(output_dir, f"{name}.{fmt}")
+        if fmt == "parquet":
+            df.to_parquet(path, index=False)
+        else:
+            df.to_json(path, orient="records", date_format="iso", indent=2)
+        manifest["tables"][name] = {"file": os.path.basename(path), "rows": len(df), "columns": list(df.columns)}
+
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--automation-file", default=automation_file_path)
+    parser.add_argument("--activity-file", default=activity_file_path)
+    parser.add_argument("--output-dir", default="report")
+    parser.add_argument("--format", choices=FORMATS, default="parquet")
+    parser.add_argument("--member-id", action="append", help="Only include this Business Unit (repeatable)")
+    parser.add_argument("--start", help="First date of the status breakdown (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last date of the status breakdown (YYYY-MM-DD)")
+    parser.add_argument("--first", nargs=2, metavar=("START", "END"), help="First comparison timeframe")
+    parser.add_argument("--second", nargs=2, metavar=("START", "END"), help="Second comparison timeframe")
+    parser.add_argument(
+        "--workers", type=int, nargs="?", const=0,
+        help="Compute per-Business-Unit tables in a process pool of this size (all CPUs if no value is given)",
+    )
+    args = parser.parse_args()
+
+    try:
+        tables = build_report(
+            args.automation_file, args.activity_file, args.member_id,
+            start=args.start, end=args.end, first=args.first, second=args.second, workers=args.workers,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    manifest = write_report(tables, args.output_dir, args.format)
+    for name, table in manifest["tables"].items():
+        print(f"{name:<16} {table['rows']:>8,} rows -> {os.path.join(args.output_dir, table['file'])}")
+
+
+if __name__ == "__main__":
+    main()
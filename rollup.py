@@ -0,0 +1,142 @@
+import pandas as pd
+
+# ===================== AUTOMATION ROLLUP =====================
+
+# One row per automation, Business Unit, status, start hour and scheduled hour
+ROLLUP_KEYS = ["name", "MemberID", "status", "start_hour", "scheduled_hour"]
+
+# Rollups of disjoint row sets merge by summing, or taking the min/max of, each measure
+ROLLUP_SUMS = ["runs", "duration_count", "duration_sum", "delay_count", "delay_sum"]
+ROLLUP_MINS = ["duration_min"]
+ROLLUP_MAXS = ["duration_max"]
+ROLLUP_MEASURES = ROLLUP_SUMS + ROLLUP_MINS + ROLLUP_MAXS
+
+
+def build_rollup(df_automation):
+    """Aggregate automation instances into a per-hour cube.
+
+    ``runs`` counts instances, ``duration_sum``/``duration_count`` give mean durations
+    and ``delay_sum``/``delay_count`` mean delays over the runs that had a schedule.
+    """
+    df = pd.DataFrame({
+        "name": df_automation["name"],
+        "status": df_automation["status"],
+        "start_hour": df_automation["start_time"].dt.floor("h"),
+        "scheduled_hour": df_automation["scheduled_time"].dt.floor("h"),
+        # Sums over many runs need float64 even when the rows hold float32 minutes
+        "duration": df_automation["duration"].astype("float64"),
+        "delay_minutes": df_automation["delay_minutes"].astype("float64").where(df_automation["scheduled_time"].notna()),
+    })
+    if "MemberID" in df_automation.columns:
+        df["MemberID"] = df_automation["MemberID"]
+
+    keys = [key for key in ROLLUP_KEYS if key in df.columns]
+    rollup = df.groupby(keys, observed=True, dropna=False).agg(
+        runs=("duration", "size"),
+        duration_count=("duration", "count"),
+        duration_sum=("duration", "sum"),
+        duration_min=("duration", "min"),
+        duration_max=("duration", "max"),
+        delay_count=("delay_minutes", "count"),
+        delay_sum=("delay_minutes", "sum"),
+    )
+    return rollup.reset_index()
+
+
+def merge_rollups(*rollups):
+    """Combine rollups of the same kind built from disjoint sets of instances."""
+    combined = pd.concat(rollups, ignore_index=True)
+    return _aggregate(combined, [col for col in combined.columns if col not in ROLLUP_MEASURES])
+
+
+def _aggregate(df_rollup, keys):
+    grouped = df_rollup.groupby(keys, observed=True, dropna=False)
+    return pd.concat([
+        grouped[[col for col in ROLLUP_SUMS if col in df_rollup.columns]].sum(),
+        grouped[[col for col in ROLLUP_MINS if col in df_rollup.columns]].min(),
+        grouped[[col for col in ROLLUP_MAXS if col in df_rollup.columns]].max(),
+    ], axis=1).reset_index()
+
+
+def coarsen_rollup(df_rollup, freq="D"):
+    """Roll the hourly cube up to ``start_period`` buckets of ``freq`` (e.g. "D" or "W").
+
+    The scheduled hour is dropped, which is what makes coarser cubes small: the
+    status, comparison and delay views never need it.
+    """
+    df = df_rollup.drop(columns=["start_hour", "scheduled_hour"])
+    if freq == "W":
+        df["start_period"] = df_rollup["start_hour"].dt.to_period("W").dt.start_time
+    else:
+        df["start_period"] = df_rollup["start_hour"].dt.floor(freq)
+    keys = [key for key in ROLLUP_KEYS if key in df.columns] + ["start_period"]
+    return _aggregate(df, keys)
+
+
+# ===================== ACTIVITY ROLLUP =====================
+
+# One row per activity type, activity and automation
+ACTIVITY_ROLLUP_KEYS = ["activity_type", "activity_name", "AutomationCustomerKey"]
+
+
+def build_activity_rollup(df_activity):
+    """Aggregate activity instances into per-activity duration sums.
+
+    This is all the time-out risk tables need, so huge activity exports can be
+    folded into it chunk by chunk instead of being held in memory.
+    """
+    df = df_activity[ACTIVITY_ROLLUP_KEYS].assign(duration=df_activity["duration"].astype("float64"))
+    rollup = df.groupby(ACTIVITY_ROLLUP_KEYS, observed=True, dropna=False).agg(
+        runs=("duration", "size"),
+        duration_count=("duration", "count"),
+        duration_sum=("duration", "sum"),
+        duration_min=("duration", "min"),
+        duration_max=("duration", "max"),
+    )
+    return rollup.reset_index()
+
+
+# ===================== AUTOMATION DIMENSION =====================
+
+AUTOMATION_DIMENSION_COLUMNS = ["AutomationCustomerKey", "MemberID", "name"]
+
+
+def build_automation_dimension(df_automation):
+    """Return one row per distinct customer key, Business Unit and name.
+
+    Joining activities against this instead of the runs keeps every join one row
+    per automation (or a few, for automations renamed over time).
+    """
+    columns = [col for col in AUTOMATION_DIMENSION_COLUMNS if col in df_automation.columns]
+    return df_automation[columns].drop_duplicates().reset_index(drop=True)
+
+
+# ===================== VIEWS =====================
+
+
+def status_counts(df_rollup):
+    """Count runs per status."""
+    counts = df_rollup.groupby("status", observed=True)["runs"].sum()
+    counts = counts[counts > 0].sort_values(ascending=False, kind="mergesort")
+    return counts.reset_index().set_axis(["Status", "Count"], axis=1)
+
+
+def average_duration(df_rollup, by):
+    """Return the mean duration per ``by`` group."""
+    sums = df_rollup.groupby(by, observed=True)[["duration_sum", "duration_count"]].sum()
+    sums = sums[sums["duration_count"] > 0]
+    return (sums["duration_sum"] / sums["duration_count"]).reset_index(name="duration")
+
+
+def weekly_average_duration(df_rollup):
+    """Return the mean duration per start week."""
+    weeks = df_rollup["start_period" if "start_period" in df_rollup.columns else "start_hour"].dt.to_period("W").astype(str)
+    sums = df_rollup.groupby(weeks)[["duration_sum", "duration_count"]].sum()
+    return (sums["duration_sum"] / sums["duration_count"]).rename_axis("week").reset_index(name="duration")
+
+
+def average_delay(df_rollup):
+    """Return the mean start delay per automation over runs that had a schedule."""
+    sums = df_rollup.groupby("name", observed=True)[["delay_sum", "delay_count"]].sum()
+    sums = sums[sums["delay_count"] > 0]
+    return (sums["delay_sum"] / sums["delay_count"]).reset_index(name="delay_minutes")
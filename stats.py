@@ -0,0 +1,222 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from loader import SNAPSHOT_LOCK_FILE, _ingest_lock, automation_file_path, fold_appended, prepare_automation_data
+
+try:
+    import pyarrow  # noqa: F401  (pandas needs it to write Parquet)
+except ImportError:  # Without pyarrow the statistics are folded from the whole export on every load
+    pyarrow = None
+
+# ===================== ONLINE AUTOMATION STATISTICS =====================
+
+# One row per automation and Business Unit. Each metric keeps a Welford count,
+# mean and sum of squared deviations, plus an exponentially weighted mean (EWMA)
+# and the first value it started from, which is what makes the EWMA of two
+# consecutive batches of runs mergeable.
+STATS_KEYS = ["name", "MemberID"]
+STATS_METRICS = ["duration", "delay"]
+STATS_EWMA_ALPHA = 0.1  # Weight of the newest run in the EWMA (about the last 10 runs)
+STATS_FORMAT = 2  # Bumped whenever the stored statistics change shape
+STATS_STATE_FILE = "state.json"  # Byte-offset watermark of the export and the committed files
+
+# Quantile sketch: values are counted in logarithmic buckets, so any quantile read
+# from it is within SKETCH_RELATIVE_ACCURACY of the true value, and the counts of
+# two batches merge by adding them
+SKETCH_RELATIVE_ACCURACY = 0.01
+SKETCH_GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+SKETCH_MIN_VALUE = 1 / 60  # Minutes; anything shorter (or negative) is counted as zero
+SKETCH_ZERO_BUCKET = -(2 ** 15)
+
+
+def _metric_values(df_automation):
+    # Durations of finished runs and delays of scheduled runs, in start time order
+    df = df_automation.sort_values("start_time", kind="mergesort", na_position="last")
+    return df, {
+        "duration": df["duration"].astype("float64"),
+        "delay": df["delay_minutes"].astype("float64").where(df["scheduled_time"].notna()),
+    }
+
+
+def build_stats(df_automation, alpha=STATS_EWMA_ALPHA):
+    """Return ``(stats, sketch)`` for a batch of runs, as if nothing came before them.
+
+    Within the batch the runs are taken in start time order. The EWMA is folded
+    in closed form: the run ``r`` places from the end of its automation's
+    sequence weighs ``alpha * (1 - alpha) ** r``, and the first value the rest.
+    """
+    df, values = _metric_values(df_automation)
+    # An export without a MemberID column keeps its automations under an empty one
+    keys = [df[key].astype(str) if key in df.columns else pd.Series("", index=df.index, name=key) for key in STATS_KEYS]
+    stats = df.groupby(keys, sort=False)["start_time"].max().rename("last_start").to_frame()
+
+    sketches = []
+    for metric, x in values.items():
+        valid = x.notna()
+        x, x_keys = x[valid], [key[valid] for key in keys]
+        grouped = x.groupby(x_keys, sort=False)
+        count = grouped.size()
+        first = grouped.first()
+        remaining = x.groupby(x_keys, sort=False).cumcount(ascending=False)
+        weighted = (alpha * (1 - alpha) ** remaining * x).groupby(x_keys, sort=False).sum()
+        stats[f"{metric}_count"] = count
+        stats[f"{metric}_mean"] = grouped.mean()
+        stats[f"{metric}_m2"] = grouped.var(ddof=0) * count
+        stats[f"{metric}_ewma"] = (1 - alpha) ** count * first + weighted
+        stats[f"{metric}_first"] = first
+
+        bucket = pd.Series(_sketch_buckets(x.to_numpy()), index=x.index, name="bucket")
+        sketch = bucket.groupby(x_keys + [bucket], sort=False).size().rename("count").reset_index()
+        sketch.insert(len(STATS_KEYS), "metric", metric)
+        sketches.append(sketch)
+
+    stats = stats.reset_index()
+    stats[[f"{metric}_count" for metric in STATS_METRICS]] = stats[[f"{metric}_count" for metric in STATS_METRICS]].fillna(0).astype(np.int64)
+    return stats, pd.concat(sketches, ignore_index=True)
+
+
+def merge_stats(earlier, later, alpha=STATS_EWMA_ALPHA):
+    """Combine the ``(stats, sketch)`` of two consecutive batches of runs, ``earlier`` first.
+
+    Counts, means and squared deviations merge with Chan's formula; the EWMA of
+    the later batch is corrected for the state it now starts from instead of its
+    own first value. Each automation costs O(1), whatever the batch sizes.
+    """
+    stats = pd.merge(earlier[0], later[0], on=STATS_KEYS, how="outer", suffixes=("_a", "_b"))
+    merged = stats[STATS_KEYS].copy()
+    merged["last_start"] = stats[["last_start_a", "last_start_b"]].max(axis=1)
+
+    for metric in STATS_METRICS:
+        n_a = stats[f"{metric}_count_a"].fillna(0).to_numpy()
+        n_b = stats[f"{metric}_count_b"].fillna(0).to_numpy()
+        mean_a, mean_b = (stats[f"{metric}_mean{side}"].fillna(0).to_numpy() for side in ["_a", "_b"])
+        m2_a, m2_b = (stats[f"{metric}_m2{side}"].fillna(0).to_numpy() for side in ["_a", "_b"])
+        ewma_a, ewma_b = (stats[f"{metric}_ewma{side}"].to_numpy() for side in ["_a", "_b"])
+        first_a, first_b = (stats[f"{metric}_first{side}"].to_numpy() for side in ["_a", "_b"])
+
+        n = n_a + n_b
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta = mean_b - mean_a
+            mean = np.where(n > 0, mean_a + delta * n_b / n, np.nan)
+            m2 = np.where(n > 0, m2_a + m2_b + delta ** 2 * n_a * n_b / n, np.nan)
+        merged[f"{metric}_count"] = n.astype(np.int64)
+        merged[f"{metric}_mean"] = mean
+        merged[f"{metric}_m2"] = m2
+        merged[f"{metric}_ewma"] = np.where(
+            n_b == 0, ewma_a, np.where(n_a == 0, ewma_b, ewma_b + (1 - alpha) ** n_b * (ewma_a - first_b))
+        )
+        merged[f"{metric}_first"] = np.where(n_a > 0, first_a, first_b)
+
+    sketch = pd.concat([earlier[1], later[1]], ignore_index=True)
+    sketch = sketch.groupby(STATS_KEYS + ["metric", "bucket"], sort=False)["count"].sum().reset_index()
+    return merged, sketch
+
+
+def fold_stats(folded, df_automation):
+    """Add a batch of runs to ``(stats, sketch)``; ``folded`` is None for the first batch."""
+    batch = build_stats(df_automation)
+    return batch if folded is None else merge_stats(folded, batch)
+
+
+# ===================== QUANTILE SKETCH =====================
+
+
+def _sketch_buckets(values):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        buckets = np.ceil(np.log(values) / np.log(SKETCH_GAMMA))
+    return np.where(values > SKETCH_MIN_VALUE, buckets, SKETCH_ZERO_BUCKET).astype(np.int32)
+
+
+def sketch_quantiles(sketch, metric, quantiles=(0.5, 0.95)):
+    """Return ``p<q>`` columns with the ``quantiles`` of ``metric`` per automation, read from the sketch."""
+    df = sketch[sketch["metric"] == metric].sort_values(STATS_KEYS + ["bucket"], kind="mergesort")
+    grouped = df.groupby(STATS_KEYS, sort=False)["count"]
+    cumulative = grouped.cumsum().to_numpy()
+    total = grouped.transform("sum").to_numpy()
+    # A bucket's values are reported as the midpoint of its range
+    value = np.where(df["bucket"] == SKETCH_ZERO_BUCKET, 0.0, 2 * SKETCH_GAMMA ** df["bucket"].to_numpy() / (SKETCH_GAMMA + 1))
+
+    result = df[STATS_KEYS].drop_duplicates().reset_index(drop=True)
+    for q in quantiles:
+        # The first bucket whose cumulative count passes the quantile's rank holds it
+        reached = df.loc[cumulative > q * (total - 1), STATS_KEYS].assign(value=value[cumulative > q * (total - 1)])
+        reached = reached.drop_duplicates(STATS_KEYS)
+        result = result.merge(reached.rename(columns={"value": f"p{round(q * 100)}"}), on=STATS_KEYS, how="left")
+    return result
+
+
+# ===================== PERSISTENCE =====================
+
+
+def stats_path(csv_path):
+    """Return the directory holding the statistics of ``csv_path`` (next to the export)."""
+    return os.path.splitext(csv_path)[0] + ".stats"
+
+
+def load_automation_stats(path=automation_file_path):
+    """Return the ``(stats, sketch)`` of every run in the export, updated with the runs appended since the last call.
+
+    The statistics are stored next to the export with the byte offset they cover,
+    so each new run is folded in once; an export that changed in any other way
+    is folded again from the start. Updates take turns under the snapshot's
+    ingest lock and take effect when the state file is replaced.
+    """
+    if pyarrow is None:
+        return fold_appended(path, prepare_automation_data, fold_stats)[0]
+
+    stats_dir = stats_path(path)
+    os.makedirs(stats_dir, exist_ok=True)
+    # Sessions fold the new runs one at a time, and the next one finds them already folded
+    with _ingest_lock(stats_dir):
+        state = _read_stats_state(stats_dir)
+        folded, watermark = None, None
+        if state is not None:
+            folded = tuple(pd.read_parquet(os.path.join(stats_dir, state[name])) for name in ["stats_file", "sketch_file"])
+            watermark = (state["offset"], state["fingerprint"])
+
+        updated, new_watermark = fold_appended(path, prepare_automation_data, fold_stats, folded, watermark)
+        if updated is None:  # An export without rows
+            updated = build_stats(prepare_automation_data(pd.read_csv(path, nrows=0)))
+        if new_watermark != watermark:
+            _write_stats(stats_dir, updated, new_watermark, 0 if state is None else state["generation"] + 1)
+    return updated
+
+
+def _read_stats_state(stats_dir):
+    try:
+        with open(os.path.join(stats_dir, STATS_STATE_FILE)) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if state.get("format") == STATS_FORMAT and state.get("alpha") == STATS_EWMA_ALPHA else None
+
+
+def _write_stats(stats_dir, folded, watermark, generation):
+    # New files are written next to the old ones and only take effect when the state
+    # file listing them is replaced, so an interrupted write leaves the old statistics
+    state = {
+        "format": STATS_FORMAT,
+        "alpha": STATS_EWMA_ALPHA,
+        "generation": generation,
+        "offset": watermark[0],
+        "fingerprint": watermark[1],
+        "stats_file": f"stats-{generation:05d}.parquet",
+        "sketch_file": f"sketch-{generation:05d}.parquet",
+    }
+    folded[0].to_parquet(os.path.join(stats_dir, state["stats_file"]), index=False)
+    folded[1].to_parquet(os.path.join(stats_dir, state["sketch_file"]), index=False)
+    tmp_path = os.path.join(stats_dir, STATS_STATE_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, os.path.join(stats_dir, STATS_STATE_FILE))
+
+    keep = {STATS_STATE_FILE, SNAPSHOT_LOCK_FILE, state["stats_file"], state["sketch_file"]}
+    for name in os.listdir(stats_dir):
+        if name not in keep:
+            try:
+                os.remove(os.path.join(stats_dir, name))
+            except OSError:  # Still open by a reader on Windows; a later update removes it
+                pass
@@ -0,0 +1,395 @@
+"""Keep the export history in an embedded SQL database and query it with filters pushed down.
+
+    python store.py --database automation_history.db --automation-file automation_data.csv --activity-file automation_activity_data.csv
+
+Imports the CSV exports (parsed chunk by chunk through the same loader as the
+dashboard) into a local SQLite file, or a DuckDB file when the path ends in
+``.duckdb`` and ``duckdb`` is installed. Date-range, Business Unit and status
+filters and the rollup aggregations run as SQL, so callers only receive the rows
+and aggregates they display. Running it again imports only the rows appended to
+the exports since the last run.
+"""
+import argparse
+import os
+import pathlib
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from loader import (
+    INGEST_CHUNK_ROWS,
+    activity_file_path,
+    automation_category_columns,
+    automation_file_path,
+    _is_append,
+    fold_appended,
+    iter_export,
+    prepare_activity_data,
+    prepare_automation_data,
+)
+from rollup import ACTIVITY_ROLLUP_KEYS, ROLLUP_MEASURES
+
+try:
+    import duckdb
+except ImportError:  # SQLite from the standard library is always available
+    duckdb = None
+
+# ===================== SCHEMA =====================
+
+database_file_path = "automation_history.db"  # Used by the dashboard when this file exists
+
+# Timestamps are stored as "YYYY-MM-DD HH:MM:SS" text, which sorts and compares in time order
+AUTOMATION_TABLE = {
+    "name": "TEXT",
+    "AutomationCustomerKey": "TEXT",
+    "MemberID": "TEXT",
+    "status": "TEXT",
+    "error": "TEXT",
+    "scheduled_time": "TEXT",
+    "start_time": "TEXT",
+    "end_time": "TEXT",
+    "duration": "REAL",
+    "delay_minutes": "REAL",
+}
+
+# Byte watermark of the export each table was imported from (see loader.fold_appended);
+# a NULL path marks a table assembled from several exports with --append
+EXPORTS_TABLE = {
+    "table_name": "TEXT PRIMARY KEY",
+    "path": "TEXT",
+    "size": "BIGINT",
+    "fingerprint": "TEXT",
+}
+
+ACTIVITY_TABLE = {
+    "automation_name": "TEXT",
+    "AutomationCustomerKey": "TEXT",
+    "activity_type": "INTEGER",
+    "activity_name": "TEXT",
+    "activity_status": "TEXT",
+    "activity_status_details": "TEXT",
+    "activity_start_time": "TEXT",
+    "activity_end_time": "TEXT",
+    "duration": "REAL",
+}
+
+INDEXES = {
+    "automations_name": ("automations", "name"),
+    "automations_member": ("automations", "MemberID"),
+    "automations_start": ("automations", "start_time"),
+    "activities_automation": ("activities", "AutomationCustomerKey"),
+}
+
+# Length of the "YYYY-MM-DD HH:MM:SS" prefix that floors a timestamp to each rollup period
+PERIOD_PREFIX = {"D": 10, "h": 13}
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _timestamp(value):
+    return pd.Timestamp(value).strftime(TIMESTAMP_FORMAT)
+
+
+class HistoryStore:
+    """Automation and activity history in an embedded database file.
+
+    Every query takes the same optional filters: ``start``/``end`` bound the
+    start time (``start <= start_time < end``), ``member_ids`` and ``statuses``
+    restrict the Business Units and statuses. Only matching rows are read,
+    through the indexes on name, MemberID and start time.
+    """
+
+    def __init__(self, path=database_file_path, read_only=False):
+        self.path = path
+        if path.endswith(".duckdb"):
+            if duckdb is None:
+                raise ImportError("A .duckdb store needs the duckdb package; use a SQLite file instead")
+            self.connection = duckdb.connect(path, read_only=read_only)
+        elif read_only:
+            self.connection = sqlite3.connect(pathlib.Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+        else:
+            self.connection = sqlite3.connect(path)
+        if not read_only:
+            self._create_schema()
+
+    def _begin(self):
+        # SQLite takes the write lock up front, so a concurrent import or sync waits for this one
+        if isinstance(self.connection, sqlite3.Connection):
+            self.connection.execute("BEGIN IMMEDIATE")
+        else:
+            self.connection.begin()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        self.connection.close()
+
+    def _create_schema(self):
+        self._begin()
+        for table, columns in [("automations", AUTOMATION_TABLE), ("activities", ACTIVITY_TABLE), ("exports", EXPORTS_TABLE)]:
+            definition = ", ".join(f'"{col}" {kind}' for col, kind in columns.items())
+            self.connection.execute(f"CREATE TABLE IF NOT EXISTS {table} ({definition})")
+        for index, (table, col) in INDEXES.items():
+            self.connection.execute(f'CREATE INDEX IF NOT EXISTS {index} ON {table} ("{col}")')
+        self.connection.commit()
+
+    def _query(self, sql, params=()):
+        cursor = self.connection.execute(sql, list(params))
+        return pd.DataFrame(cursor.fetchall(), columns=[col[0] for col in cursor.description])
+
+    # ===================== IMPORT =====================
+
+    def import_export(self, csv_path, table, replace=True, chunk_rows=INGEST_CHUNK_ROWS):
+        """Load an export into ``"automations"`` or ``"activities"`` and return the number of rows.
+
+        The export is parsed ``chunk_rows`` rows at a time; with ``replace`` the
+        table's previous rows are dropped in the same transaction and the table
+        is synced with the export from then on (see ``sync``). Without it the
+        rows are added to the history, which is no longer synced.
+        """
+        if replace:
+            self._begin()
+            return self._import(csv_path, table, None, chunk_rows)
+
+        columns, prepare = _TABLES[table]
+        imported = 0
+        with open(csv_path, "rb") as f:
+            header = f.readline()
+            length = os.fstat(f.fileno()).st_size - len(header)
+            self._begin()
+            for df in iter_export(f, prepare, header, length, chunk_rows):
+                self.connection.executemany(_insert(table, columns), _rows(df, columns))
+                imported += len(df)
+        self.connection.execute("INSERT OR REPLACE INTO exports VALUES (?, NULL, NULL, NULL)", [table])
+        self.connection.commit()
+        return imported
+
+    def sync(self, csv_path, table, chunk_rows=INGEST_CHUNK_ROWS):
+        """Bring ``table`` up to date with the export it was imported from and return the rows added.
+
+        Rows appended to the export since the last import or sync are inserted,
+        recognised by the same byte watermark as the Parquet snapshots; any other
+        change to the export, or a different export, replaces the table's rows.
+        A table assembled with ``replace=False`` imports is left as it is.
+        """
+        self._begin()
+        state = self.connection.execute("SELECT path, size, fingerprint FROM exports WHERE table_name = ?", [table]).fetchone()
+        if state is not None and state[0] is None:
+            self.connection.commit()
+            return 0
+        watermark = (state[1], state[2]) if state is not None and state[0] == os.path.abspath(csv_path) else None
+        if watermark is not None:
+            with open(csv_path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                unchanged = size == watermark[0] and _is_append(f, size, *watermark)
+            if unchanged:  # Nothing to import; leave the file (and the readers' cache keys) untouched
+                self.connection.commit()
+                return 0
+        return self._import(csv_path, table, watermark, chunk_rows)
+
+    def _import(self, csv_path, table, watermark, chunk_rows):
+        # Inside an open transaction: fold the export's new rows into the table, then store the watermark
+        columns, prepare = _TABLES[table]
+        insert = _insert(table, columns)
+
+        def fold(imported, df):
+            if imported is None:  # Not an append of what the table holds: start over
+                self.connection.execute(f"DELETE FROM {table}")
+                imported = 0
+            self.connection.executemany(insert, _rows(df, columns))
+            return imported + len(df)
+
+        imported, (size, fingerprint) = fold_appended(csv_path, prepare, fold, 0 if watermark else None, watermark, chunk_rows)
+        if imported is None:  # A new export without rows
+            self.connection.execute(f"DELETE FROM {table}")
+            imported = 0
+        self.connection.execute(
+            "INSERT OR REPLACE INTO exports VALUES (?, ?, ?, ?)", [table, os.path.abspath(csv_path), size, fingerprint]
+        )
+        self.connection.commit()
+        return imported
+
+    # ===================== QUERIES =====================
+
+    def _where(self, start=None, end=None, member_ids=None, statuses=None, names=None, time_column="start_time"):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append(f"{time_column} >= ?")
+            params.append(_timestamp(start))
+        if end is not None:
+            clauses.append(f"{time_column} < ?")
+            params.append(_timestamp(end))
+        for col, values in [("MemberID", member_ids), ("status", statuses), ("name", names)]:
+            if values is not None:
+                values = [str(value) for value in values]
+                clauses.append(f'"{col}" IN ({", ".join("?" for _ in values)})' if values else "1 = 0")
+                params.extend(values)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def runs(self, start=None, end=None, member_ids=None, statuses=None, names=None, columns=None):
+        """Return the matching automation runs in start time order, typed like ``loader.load_automation_data``."""
+        columns = list(columns or AUTOMATION_TABLE)
+        where, params = self._where(start, end, member_ids, statuses, names)
+        select = ", ".join(f'"{col}"' for col in columns)
+        df = self._query(f"SELECT {select} FROM automations{where} ORDER BY start_time IS NULL, start_time, rowid", params)
+        return _typed(df, AUTOMATION_TABLE, automation_category_columns)
+
+    def member_ids(self):
+        """Return the Business Units in the history, sorted."""
+        df = self._query('SELECT DISTINCT "MemberID" FROM automations WHERE "MemberID" IS NOT NULL ORDER BY "MemberID"')
+        return df["MemberID"].tolist()
+
+    def summary(self, member_ids=None):
+        """Return the run count, first and last start, last scheduled time and sorted names of the matching runs."""
+        where, params = self._where(member_ids=member_ids)
+        runs, first_start, last_start, last_scheduled = self.connection.execute(
+            f"SELECT COUNT(*), MIN(start_time), MAX(start_time), MAX(scheduled_time) FROM automations{where}", params
+        ).fetchone()
+        names = self._query(f"SELECT DISTINCT name FROM automations{where} ORDER BY name", params)["name"].tolist()
+        return {
+            "runs": runs,
+            "first_start": pd.Timestamp(first_start),
+            "last_start": pd.Timestamp(last_start),
+            "last_scheduled": pd.Timestamp(last_scheduled),
+            "names": names,
+        }
+
+    def schedule_rollup(self, start=None, end=None, member_ids=None):
+        """Return the run count per name, Business Unit and ``scheduled_hour`` of the runs scheduled in ``[start, end)``."""
+        where, params = self._where(start, end, member_ids, time_column="scheduled_time")
+        df = self._query(
+            f"""
+            SELECT name, "MemberID", substr(scheduled_time, 1, {PERIOD_PREFIX["h"]}) AS scheduled_hour, COUNT(*) AS runs
+            FROM automations{where}
+            GROUP BY name, "MemberID", scheduled_hour
+            ORDER BY scheduled_hour
+            """,
+            params,
+        )
+        df["scheduled_hour"] = pd.to_datetime(df["scheduled_hour"], format="%Y-%m-%d %H")
+        return _typed(df, {}, ["name", "MemberID"])
+
+    def rollup(self, start=None, end=None, member_ids=None, statuses=None, names=None, freq="D"):
+        """Return the matching runs as a rollup with ``start_period`` buckets of ``freq`` ("h" or "D").
+
+        The frame has the columns of ``rollup.coarsen_rollup``, so the rollup
+        views (``status_counts``, ``average_duration``, ...) apply unchanged.
+        """
+        where, params = self._where(start, end, member_ids, statuses, names)
+        df = self._query(
+            f"""
+            SELECT name, "MemberID", status, substr(start_time, 1, {PERIOD_PREFIX[freq]}) AS start_period,
+                   COUNT(*) AS runs,
+                   COUNT(duration) AS duration_count,
+                   COALESCE(SUM(duration), 0) AS duration_sum,
+                   MIN(duration) AS duration_min,
+                   MAX(duration) AS duration_max,
+                   COUNT(CASE WHEN scheduled_time IS NOT NULL THEN delay_minutes END) AS delay_count,
+                   COALESCE(SUM(CASE WHEN scheduled_time IS NOT NULL THEN delay_minutes END), 0) AS delay_sum
+            FROM automations{where}
+            GROUP BY name, "MemberID", status, start_period
+            ORDER BY start_period IS NULL, start_period
+            """,
+            params,
+        )
+        df["start_period"] = pd.to_datetime(df["start_period"], format="%Y-%m-%d" if freq == "D" else "%Y-%m-%d %H")
+        df = df.astype({col: "float64" for col in ROLLUP_MEASURES if col not in ["runs", "duration_count", "delay_count"]})
+        return _typed(df, {}, ["name", "MemberID", "status"])
+
+    def activity_rollup(self, member_ids=None):
+        """Return the activity duration sums of ``rollup.build_activity_rollup`` for the selected Business Units."""
+        where, params = "", []
+        if member_ids is not None:
+            values = [str(value) for value in member_ids]
+            where = (
+                ' WHERE "AutomationCustomerKey" IN (SELECT "AutomationCustomerKey" FROM automations WHERE "MemberID" IN '
+                f'({", ".join("?" for _ in values)}))'
+            ) if values else " WHERE 1 = 0"
+            params = values
+        keys = ", ".join(f'"{key}"' for key in ACTIVITY_ROLLUP_KEYS)
+        df = self._query(
+            f"""
+            SELECT {keys},
+                   COUNT(*) AS runs,
+                   COUNT(duration) AS duration_count,
+                   COALESCE(SUM(duration), 0) AS duration_sum,
+                   MIN(duration) AS duration_min,
+                   MAX(duration) AS duration_max
+            FROM activities{where}
+            GROUP BY {keys}
+            """,
+            params,
+        )
+        df["activity_type"] = df["activity_type"].astype("Int16")
+        df = df.astype({col: "float64" for col in ["duration_sum", "duration_min", "duration_max"]})
+        return _typed(df, {}, ["activity_name", "AutomationCustomerKey"])
+
+    def automation_dimension(self, member_ids=None):
+        """Return the distinct customer key, Business Unit and name rows of ``rollup.build_automation_dimension``."""
+        where, params = self._where(member_ids=member_ids)
+        df = self._query(f'SELECT DISTINCT "AutomationCustomerKey", "MemberID", name FROM automations{where}', params)
+        return _typed(df, {}, ["AutomationCustomerKey", "MemberID", "name"])
+
+
+_TABLES = {
+    "automations": (AUTOMATION_TABLE, prepare_automation_data),
+    "activities": (ACTIVITY_TABLE, prepare_activity_data),
+}
+
+
+def _insert(table, columns):
+    names = ", ".join(f'"{col}"' for col in columns)
+    return f"INSERT INTO {table} ({names}) VALUES ({', '.join('?' for _ in columns)})"
+
+
+def _rows(df, columns):
+    # Plain Python values in table column order: text for timestamps, None for anything missing
+    values = []
+    for col, kind in columns.items():
+        if col not in df.columns:
+            values.append([None] * len(df))
+            continue
+        series = df[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            series = series.dt.strftime(TIMESTAMP_FORMAT)
+        series = series.astype(object)
+        values.append(series.where(series.notna(), None).tolist())
+    return zip(*values)
+
+
+def _typed(df, columns, category_columns):
+    # Text timestamps back to datetimes and repeated text to sorted categoricals, as the loader returns them
+    for col, kind in columns.items():
+        if col in df.columns and col.endswith("_time"):
+            df[col] = pd.to_datetime(df[col], format=TIMESTAMP_FORMAT)
+        elif col in df.columns and kind == "REAL":
+            df[col] = df[col].astype(np.float32)
+    for col in category_columns:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+            df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", default=database_file_path)
+    parser.add_argument("--automation-file", default=automation_file_path)
+    parser.add_argument("--activity-file", default=activity_file_path)
+    parser.add_argument("--append", action="store_true", help="Add the exports' rows instead of replacing the stored history")
+    args = parser.parse_args()
+
+    with HistoryStore(args.database) as store:
+        for table, path in [("automations", args.automation_file), ("activities", args.activity_file)]:
+            if path and os.path.exists(path):
+                rows = store.import_export(path, table, replace=False) if args.append else store.sync(path, table)
+                print(f"{table:<12} {rows:>10,} rows <- {path}")
+
+
+if __name__ == "__main__":
+    main()
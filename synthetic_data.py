@@ -0,0 +1,207 @@
+"""Generate synthetic SFMC automation exports for benchmarking the dashboard.
+
+    python synthetic_data.py --instances 1000000 --output-dir bench_data
+
+Writes ``automation_data.csv`` and ``automation_activity_data.csv`` in the same
+layout as the Automation Studio data views described in the README. Output is
+fully determined by ``--seed``.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from loader import DATE_FORMAT, activity_file_path, automation_file_path
+
+# ===================== SHAPE OF THE DATA =====================
+
+START = np.datetime64("2025-01-01T00:00:00", "s")
+
+SCHEDULES = {  # Minutes between runs and the share of automations on that schedule
+    15: 0.05,
+    60: 0.30,
+    1440: 0.65,
+}
+
+ACTIVITY_TYPES = {  # ActivityType, name prefix and share of activities
+    300: ("Query", 0.45),
+    423: ("Script", 0.25),
+    73: ("Extract", 0.15),
+    42: ("Email", 0.15),
+}
+
+ERROR_RATE = 0.03
+RUNNING_RATE = 0.002  # Runs exported without an end time
+
+ERROR_MESSAGES = [
+    "Query timed out after 30 minutes.",
+    "An error occurred while processing the script activity.",
+    "Error: Target data extension not found.",
+    "File transfer failed: remote host closed the connection.",
+    "Email send was suppressed because the audience is empty.",
+]
+
+CHUNK_ROWS = 500_000  # Rows formatted and written per CSV chunk
+
+
+# ===================== GENERATION =====================
+
+
+def generate_automations(n_automations, n_members, rng):
+    """Return one row per automation with its schedule and duration profile."""
+    periods = rng.choice(list(SCHEDULES), size=n_automations, p=list(SCHEDULES.values()))
+    member_ids = rng.integers(0, n_members, size=n_automations)
+
+    # Typical run lengths: short for frequent schedules, some hourly ones close to an hour
+    typical = np.where(periods <= 60, rng.lognormal(2.0, 0.8, n_automations), rng.lognormal(2.5, 1.0, n_automations))
+    near_hour = (periods == 60) & (rng.random(n_automations) < 0.15)
+    typical = np.where(near_hour, rng.uniform(45, 58, n_automations), np.minimum(typical, periods * 0.8))
+
+    return pd.DataFrame({
+        "name": [f"Automation_{i:05d}" for i in range(n_automations)],
+        "customer_key": [f"{i:08x}-{seed:04x}-auto" for i, seed in enumerate(rng.integers(0, 2**16, n_automations))],
+        "member_id": 100000000 + member_ids * 1111,
+        "period": periods,
+        "offset": (rng.random(n_automations) * np.minimum(periods, 1440)).astype(np.int64),
+        "typical_duration": typical,
+        "activities": rng.integers(1, 4, n_automations),
+    })
+
+
+def generate_instances(automations, n_instances, rng):
+    """Return about ``n_instances`` runs spread over the automations' schedules, ordered by schedule.
+
+    The history covers whole days, so every automation runs on every day of it.
+    """
+    periods = automations["period"].to_numpy()
+    days = max(round(n_instances / (1440 / periods).sum()), 2)
+    runs = days * 1440 // periods
+
+    automation = np.repeat(np.arange(len(automations)), runs)
+    run_number = np.arange(len(automation)) - np.repeat(np.cumsum(runs) - runs, runs)
+
+    period = periods[automation]
+    scheduled = START + ((automations["offset"].to_numpy()[automation] + run_number * period) * 60).astype("timedelta64[s]")
+
+    # Most runs start within seconds of their schedule; a few are queued for a while
+    delay = rng.exponential(20, len(automation)) + (rng.random(len(automation)) < 0.02) * rng.exponential(900, len(automation))
+    started = scheduled + delay.astype("timedelta64[s]")
+
+    typical = automations["typical_duration"].to_numpy()[automation]
+    duration = typical * rng.lognormal(0, 0.25, len(automation))
+    ended = started + (duration * 60).astype("timedelta64[s]")
+
+    roll = rng.random(len(automation))
+    status = np.where(roll < ERROR_RATE, "Error", np.where(roll < ERROR_RATE + RUNNING_RATE, "Running", "Complete"))
+    error = np.where(status == "Error", np.array(ERROR_MESSAGES)[rng.integers(0, len(ERROR_MESSAGES), len(automation))], "")
+    ended = np.where(status == "Running", np.datetime64("NaT"), ended)
+
+    order = np.argsort(scheduled, kind="stable")
+    return pd.DataFrame({
+        "automation": automation[order],
+        "AutomationInstanceID": np.char.add("inst-", np.arange(len(automation)).astype(str)),
+        "scheduled": scheduled[order],
+        "started": started[order],
+        "ended": ended[order],
+        "status": status[order],
+        "error": error[order],
+    })
+
+
+def generate_activities(automations, instances, rng):
+    """Return the activity runs of every instance, splitting each run's time between its steps."""
+    steps = automations["activities"].to_numpy()[instances["automation"].to_numpy()]
+    instance = np.repeat(np.arange(len(instances)), steps)
+    step = np.arange(len(instance)) - np.repeat(np.cumsum(steps) - steps, steps)
+    automation = instances["automation"].to_numpy()[instance]
+
+    # Each automation always runs the same steps, so activity names repeat run after run
+    type_codes = np.array(list(ACTIVITY_TYPES))
+    type_shares = np.array([share for _, share in ACTIVITY_TYPES.values()])
+    step_type = rng.choice(type_codes, size=(len(automations), 3), p=type_shares)
+    activity_type = step_type[automation, step]
+    prefixes = {code: prefix for code, (prefix, _) in ACTIVITY_TYPES.items()}
+    prefix = pd.Series(activity_type).map(prefixes).to_numpy(dtype=object)
+    activity_name = prefix + "_" + automations["name"].to_numpy()[automation] + "_" + step.astype(str)
+
+    started = instances["started"].to_numpy()[instance]
+    ended = instances["ended"].to_numpy()[instance]
+    run_seconds = (ended - started) / np.timedelta64(1, "s")  # NaN for runs without an end
+
+    # Steps run back to back; a weight per step decides its share of the run
+    weights = rng.random(len(instance)) + 0.2
+    totals = np.repeat(np.bincount(instance, weights, minlength=len(instances)), steps)
+    cumulative = np.cumsum(weights)
+    run_offset = np.repeat(np.concatenate([[0.0], cumulative[np.cumsum(steps)[:-1] - 1]]), steps)
+    before = cumulative - weights - run_offset
+    activity_start = started + np.nan_to_num(run_seconds * before / totals).astype("timedelta64[s]")
+    activity_end = activity_start + np.nan_to_num(run_seconds * weights / totals).astype("timedelta64[s]")
+    activity_end = np.where(np.isnan(run_seconds), np.datetime64("NaT"), activity_end)
+
+    return pd.DataFrame({
+        "AutomationInstanceID": instances["AutomationInstanceID"].to_numpy()[instance],
+        "AutomationName": automations["name"].to_numpy()[automation],
+        "AutomationCustomerKey": automations["customer_key"].to_numpy()[automation],
+        "ActivityType": activity_type,
+        "ActivityName": activity_name,
+        "ActivityInstanceID": np.char.add("act-", np.arange(len(instance)).astype(str)),
+        "ActivityInstanceStartTime_UTC": activity_start,
+        "ActivityInstanceEndTime_UTC": activity_end,
+    })
+
+
+def _write_csv(df, path, date_columns):
+    # Format timestamps chunk by chunk so memory stays bounded at the largest scales
+    for start in range(0, max(len(df), 1), CHUNK_ROWS):
+        chunk = df.iloc[start:start + CHUNK_ROWS].copy()
+        for col in date_columns:
+            chunk[col] = pd.Series(chunk[col]).dt.strftime(DATE_FORMAT)
+        chunk.to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+
+
+def generate(output_dir, n_instances, n_automations=None, n_members=3, seed=0):
+    """Write both exports to ``output_dir`` and return their paths."""
+    rng = np.random.default_rng(seed)
+    n_automations = n_automations or int(np.clip(np.sqrt(n_instances) / 2, 10, 2000))
+
+    automations = generate_automations(n_automations, n_members, rng)
+    instances = generate_instances(automations, n_instances, rng)
+    activities = generate_activities(automations, instances, rng)
+
+    os.makedirs(output_dir, exist_ok=True)
+    automation_path = os.path.join(output_dir, automation_file_path)
+    activity_path = os.path.join(output_dir, activity_file_path)
+
+    automation_index = instances["automation"].to_numpy()
+    _write_csv(pd.DataFrame({
+        "AutomationInstanceID": instances["AutomationInstanceID"],
+        "AutomationName": automations["name"].to_numpy()[automation_index],
+        "AutomationCustomerKey": automations["customer_key"].to_numpy()[automation_index],
+        "AutomationInstanceScheduledTime_UTC": instances["scheduled"],
+        "AutomationInstanceStartTime_UTC": instances["started"],
+        "AutomationInstanceEndTime_UTC": instances["ended"],
+        "AutomationInstanceStatus": instances["status"],
+        "AutomationInstanceActivityErrorDetails": instances["error"],
+        "MemberID": automations["member_id"].to_numpy()[automation_index],
+    }), automation_path, ["AutomationInstanceScheduledTime_UTC", "AutomationInstanceStartTime_UTC", "AutomationInstanceEndTime_UTC"])
+    _write_csv(activities, activity_path, ["ActivityInstanceStartTime_UTC", "ActivityInstanceEndTime_UTC"])
+
+    return automation_path, activity_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--instances", type=int, default=10_000, help="Approximate number of automation runs (10k to 10M)")
+    parser.add_argument("--automations", type=int, default=None, help="Number of distinct automations")
+    parser.add_argument("--members", type=int, default=3, help="Number of Business Units (MemberIDs)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", default=".")
+    args = parser.parse_args()
+
+    for path in generate(args.output_dir, args.instances, args.automations, args.members, args.seed):
+        print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
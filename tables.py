@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# ===================== PAGED TABLES =====================
+
+PAGE_SIZE = 50  # Rows sent to the browser at a time
+HIGHLIGHT_STYLE = "background-color: lightcoral"
+EXPORT_ORDER = "(export order)"  # Sort option that keeps the rows as they are
+
+
+def sort_page(df, sort_by=None, descending=False, page=1, page_size=PAGE_SIZE):
+    """Return page ``page`` (from 1) of ``df`` ordered by ``sort_by``, missing values last.
+
+    Only the sort column is ordered, as row positions, and only the page's rows
+    are taken from the frame.
+    """
+    if sort_by is None:
+        positions = np.arange(len(df))
+    else:
+        values = df[sort_by].reset_index(drop=True)
+        positions = values.sort_values(ascending=not descending, kind="mergesort", na_position="last").index.to_numpy()
+    start = (page - 1) * page_size
+    return df.iloc[positions[start:start + page_size]]
+
+
+def highlight_rows(page, mask, style=HIGHLIGHT_STYLE):
+    """Return a Styler giving the rows of ``page`` where ``mask`` is True the ``style`` CSS.
+
+    The CSS of the whole page is one array built with ``np.where``, applied in a
+    single call rather than by a Python function per row.
+    """
+    styles = np.where(np.asarray(mask, dtype=bool)[:, None], style, "")
+    css = pd.DataFrame(np.broadcast_to(styles, page.shape), index=page.index, columns=page.columns)
+    return page.style.apply(lambda _: css, axis=None)
+
+
+def paged_table(df, key, column_config=None, highlight=None, page_size=PAGE_SIZE, hide_index=True, height="auto"):
+    """Show ``df`` a page at a time, sorted and sliced on the server.
+
+    Sort and page controls sit above the table, and only the current page is
+    styled and sent to the browser. ``column_config`` formats columns in the
+    browser (e.g. ``st.column_config.DatetimeColumn``), and ``highlight`` maps the
+    page to a boolean mask of rows to highlight. Widget keys start with ``key``.
+    """
+    n_pages = max(1, -(-len(df) // page_size))
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > n_pages:  # The table shrank since the last run
+        st.session_state[page_key] = 1
+
+    col1, col2, col3 = st.columns([0.5, 0.2, 0.3])
+    sort_by = col1.selectbox("Sort by", [EXPORT_ORDER] + list(df.columns), key=f"{key}_sort")
+    descending = col2.toggle("Descending", key=f"{key}_descending", disabled=sort_by == EXPORT_ORDER)
+    page_number = col3.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, step=1, key=page_key)
+
+    page = sort_page(df, None if sort_by == EXPORT_ORDER else sort_by, descending, page_number, page_size)
+    data = page if highlight is None else highlight_rows(page, highlight(page))
+    st.dataframe(data, column_config=column_config, hide_index=hide_index, use_container_width=True, height=height)
+
+    first = (page_number - 1) * page_size
+    st.caption(f"Rows {first + 1:,}–{first + len(page):,} of {len(df):,}" if len(df) else "No rows")
+    return page
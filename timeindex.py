@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+
+class TimeIndex:
+    """Range queries over a frame kept sorted by one datetime column.
+
+    Rows are ordered by ``column`` with missing timestamps last, so a time range is
+    a contiguous block found with two binary searches and returned as a slice of
+    the frame. With ``by`` set, the row positions of each key (e.g. each automation
+    name) are indexed on first use, which turns one key's history into a take of
+    already time-ordered rows.
+    """
+
+    def __init__(self, df, column, by=None):
+        values = df[column]
+        n_valid = int(values.notna().sum())
+
+        # Frames from the loader are already in order; anything else is sorted once here
+        if not (values.iloc[:n_valid].notna().all() and values.iloc[:n_valid].is_monotonic_increasing):
+            df = df.sort_values(column, kind="mergesort", na_position="last")
+            values = df[column]
+
+        self.frame = df
+        self.column = column
+        self.by = by
+        self._values = values.to_numpy()[:n_valid]
+        self._positions = None
+
+    def __len__(self):
+        return len(self.frame)
+
+    def _bounds(self, start=None, end=None):
+        lo = 0 if start is None else int(np.searchsorted(self._values, np.datetime64(pd.Timestamp(start)), side="left"))
+        hi = len(self._values) if end is None else int(np.searchsorted(self._values, np.datetime64(pd.Timestamp(end)), side="left"))
+        return lo, max(lo, hi)
+
+    def between(self, start=None, end=None):
+        """Return the rows with ``start <= column < end``; either bound may be omitted."""
+        lo, hi = self._bounds(start, end)
+        return self.frame.iloc[lo:hi]
+
+    def count(self, start=None, end=None):
+        """Return how many rows ``between(start, end)`` would return, without slicing."""
+        lo, hi = self._bounds(start, end)
+        return hi - lo
+
+    def rows_for(self, key):
+        """Return every row of ``key`` in time order, using the secondary index on ``by``."""
+        if self.by is None:
+            raise ValueError("TimeIndex was built without a 'by' column")
+        if self._positions is None:
+            self._positions = self.frame.groupby(self.by, observed=True, sort=False).indices
+        return self.frame.iloc[self._positions.get(key, np.array([], dtype=np.intp))]